@@ -1,9 +1,18 @@
-import time
-import bcrypt
-from flask import Flask, render_template, session
+import os
+import click
+from flask import Flask, render_template
 from datetime import timedelta
 from config import Configuracion
-from db import ejecutar_consulta, obtener_conexion
+from db import ejecutar_consulta, consultar_en_paralelo, registrar_db
+from perfilador import registrar_perfilador
+from imagenes import registrar_imagenes, rellenar_existentes
+from fragmentos import registrar_fragmentos
+from consultas import obtener_categorias, invalidar_catalogo
+from resumen_ventas import reconstruir_resumenes
+from carritos import almacen, total_articulos
+from seguridad import ServicioSaturadoError
+from cache_http import respuesta_condicional
+from migraciones import migrar, estado as estado_migraciones
 
 # Importar blueprints
 from routes.auth import auth_bp
@@ -13,60 +22,6 @@ from routes.pedidos import pedidos_bp
 from routes.admin import admin_bp
 
 
-def inicializar_admin():
-    """Crea el usuario administrador si no existe con contraseña encriptada"""
-    # Esperar a que la base de datos esté lista
-    intentos = 0
-    while intentos < 30:
-        conexion = obtener_conexion()
-        if conexion:
-            conexion.close()
-            break
-        print(f"Esperando conexión a la base de datos... intento {intentos + 1}")
-        time.sleep(2)
-        intentos += 1
-
-    # Migración: agregar columna icono a categorias si no existe
-    try:
-        ejecutar_consulta(
-            "ALTER TABLE categorias ADD COLUMN icono VARCHAR(50) DEFAULT 'bi-tag'",
-        )
-        # Asignar íconos por defecto a categorías existentes
-        iconos_default = {
-            'Electrónica': 'bi-cpu', 'Electronica': 'bi-cpu',
-            'Ropa': 'bi-handbag',
-            'Hogar': 'bi-house-heart',
-            'Deportes': 'bi-dribbble',
-            'Libros': 'bi-book'
-        }
-        for nombre, icono in iconos_default.items():
-            ejecutar_consulta(
-                "UPDATE categorias SET icono = %s WHERE nombre = %s AND (icono IS NULL OR icono = 'bi-tag')",
-                (icono, nombre)
-            )
-        print("✓ Columna 'icono' agregada a categorías")
-    except Exception:
-        pass  # La columna ya existe
-
-    # Verificar si el admin ya existe
-    admin = ejecutar_consulta(
-        "SELECT id FROM usuarios WHERE email = %s",
-        ('admin@tienda.com',),
-        obtener_uno=True
-    )
-
-    if not admin:
-        # Crear admin con contraseña encriptada con bcrypt
-        password_hash = bcrypt.hashpw('admin123'.encode('utf-8'), bcrypt.gensalt())
-        ejecutar_consulta(
-            "INSERT INTO usuarios (nombre, email, password, rol) VALUES (%s, %s, %s, 'admin')",
-            ('Administrador', 'admin@tienda.com', password_hash.decode('utf-8'))
-        )
-        print("✓ Usuario administrador creado exitosamente.")
-    else:
-        print("✓ Usuario administrador ya existe")
-
-
 def crear_app():
     """Crea y configura la aplicación Flask"""
     app = Flask(__name__)
@@ -74,6 +29,12 @@ def crear_app():
     app.config['MAX_CONTENT_LENGTH'] = Configuracion.MAX_CONTENIDO
     app.permanent_session_lifetime = timedelta(hours=24)
 
+    # Una conexión del pool por petición
+    registrar_db(app)
+    registrar_perfilador(app)
+    registrar_imagenes(app)
+    registrar_fragmentos(app)
+
     # Registrar blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(productos_bp)
@@ -81,15 +42,42 @@ def crear_app():
     app.register_blueprint(pedidos_bp)
     app.register_blueprint(admin_bp)
 
+    @app.cli.command('migrar')
+    @click.option('--estado', is_flag=True, help='Solo muestra qué migraciones están aplicadas')
+    def comando_migrar(estado):
+        """Aplica las migraciones pendientes del esquema"""
+        if estado:
+            for version, nombre, aplicada in estado_migraciones():
+                print(f"{'✓' if aplicada else '·'} {nombre}")
+            return
+        aplicadas = migrar()
+        print(f"✓ {len(aplicadas)} migraciones aplicadas" if aplicadas else "✓ El esquema está al día")
+
+    @app.cli.command('reconstruir-resumenes')
+    def comando_reconstruir_resumenes():
+        """Recalcula las tablas de resumen de ventas del panel"""
+        reconstruir_resumenes()
+        print("✓ Resúmenes de ventas reconstruidos")
+
+    @app.cli.command('purgar-carritos')
+    def comando_purgar_carritos():
+        """Borra los carritos sin cambios en los últimos CARRITO_DIAS días"""
+        borrados = almacen().purgar(Configuracion.CARRITO_DIAS)
+        print(f"✓ {borrados or 0} productos de carritos abandonados borrados")
+
+    @app.cli.command('procesar-imagenes')
+    def comando_procesar_imagenes():
+        """Pasa las imágenes existentes a nombres con hash y genera sus variantes"""
+        renombradas, procesadas = rellenar_existentes()
+        if renombradas:
+            invalidar_catalogo()
+        print(f"✓ {renombradas} imágenes renombradas, {procesadas} con variantes nuevas")
+
     # Contexto global para templates
     @app.context_processor
     def contexto_global():
-        carrito = session.get('carrito', {})
-        total_carrito = sum(item['cantidad'] for item in carrito.values())
-        categorias_nav = ejecutar_consulta(
-            "SELECT * FROM categorias ORDER BY nombre",
-            obtener_todos=True
-        ) or []
+        total_carrito = total_articulos()
+        categorias_nav = obtener_categorias()
         return {
             'total_carrito': total_carrito,
             'categorias_nav': categorias_nav
@@ -97,19 +85,24 @@ def crear_app():
 
     # Ruta principal
     @app.route('/', endpoint='principal.inicio')
+    @respuesta_condicional('inicio', cache_pagina=True)
     def inicio():
         """Página de inicio dinámica"""
-        productos_destacados = ejecutar_consulta(
-            "SELECT * FROM productos WHERE activo = 1 ORDER BY fecha_creacion DESC LIMIT 8",
-            obtener_todos=True
-        ) or []
-
-        categorias = ejecutar_consulta(
-            "SELECT c.*, COUNT(p.id) as total_productos FROM categorias c LEFT JOIN productos p ON c.id = p.categoria_id AND p.activo = 1 GROUP BY c.id ORDER BY c.nombre",
-            obtener_todos=True
-        ) or []
-
-        return render_template('inicio.html', productos=productos_destacados, categorias=categorias)
+        resultados = consultar_en_paralelo({
+            'destacados': lambda: ejecutar_consulta(
+                "SELECT * FROM productos WHERE activo = 1 ORDER BY fecha_creacion DESC LIMIT 8",
+                obtener_todos=True
+            ),
+            'categorias': lambda: ejecutar_consulta(
+                "SELECT c.*, COUNT(p.id) as total_productos FROM categorias c LEFT JOIN productos p ON c.id = p.categoria_id AND p.activo = 1 GROUP BY c.id ORDER BY c.nombre",
+                obtener_todos=True
+            ),
+            # Deja en caché las categorías del menú que usa contexto_global()
+            'categorias_nav': obtener_categorias,
+        })
+
+        return render_template('inicio.html', productos=resultados['destacados'] or [],
+                               categorias=resultados['categorias'] or [])
 
     # Manejo de errores
     @app.errorhandler(404)
@@ -120,10 +113,16 @@ def crear_app():
     def error_servidor(e):
         return render_template('500.html'), 500
 
+    @app.errorhandler(ServicioSaturadoError)
+    def servicio_saturado(e):
+        # Rechazo rápido: mejor reintentar que dejar el hilo esperando
+        return render_template('503.html'), 503, {'Retry-After': str(Configuracion.HASH_REINTENTO)}
+
     return app
 
 
 if __name__ == '__main__':
+    # Servidor de desarrollo; en producción se usa gunicorn (ver wsgi.py)
     app = crear_app()
-    inicializar_admin()
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    migrar()
+    app.run(host='0.0.0.0', port=5000, debug=os.environ.get('FLASK_ENV') == 'development')
@@ -0,0 +1,89 @@
+import re
+import unicodedata
+from db import ejecutar_consulta
+from config import Configuracion
+
+_RE_TERMINOS = re.compile(r'\w+')
+
+
+def normalizar(texto):
+    """
+    Pliega mayúsculas y acentos: "Electrónica" y "electronica" quedan
+    iguales. La colación utf8mb4_unicode_ci hace lo mismo en MySQL, así
+    que el resultado sirve tanto de clave de caché como de término.
+    """
+    descompuesto = unicodedata.normalize('NFKD', texto)
+    sin_acentos = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_acentos.casefold().split())
+
+
+def terminos(texto):
+    """Palabras de una búsqueda, normalizadas y sin operadores FULLTEXT"""
+    return _RE_TERMINOS.findall(normalizar(texto))
+
+
+def condicion_busqueda(texto):
+    """
+    Condición SQL para filtrar productos por texto.
+
+    Los términos de al menos BUSQUEDA_MIN_TOKEN caracteres se buscan con
+    el índice FULLTEXT (como prefijo, para el autocompletado); los más
+    cortos no están en el índice y se filtran con LIKE.
+
+    Returns:
+        (condicion, parametros, expresion): `expresion` es la consulta
+        booleana para calcular la relevancia, o None si no hay términos
+        indexables.
+    """
+    largos, cortos = [], []
+    for termino in terminos(texto):
+        (largos if len(termino) >= Configuracion.BUSQUEDA_MIN_TOKEN else cortos).append(termino)
+
+    partes = []
+    parametros = []
+    expresion = None
+    if largos:
+        expresion = ' '.join(f'+{termino}*' for termino in largos)
+        partes.append("MATCH(p.nombre, p.descripcion) AGAINST (%s IN BOOLEAN MODE)")
+        parametros.append(expresion)
+    for termino in cortos:
+        partes.append("(p.nombre LIKE %s OR p.descripcion LIKE %s)")
+        parametros.extend([f'%{termino}%', f'%{termino}%'])
+    return ' AND '.join(partes), parametros, expresion
+
+
+def ids_por_relevancia(condiciones, parametros, expresion):
+    """
+    IDs de los productos que cumplen `condiciones`, ordenados por
+    relevancia (las coincidencias en el nombre pesan el doble).
+
+    Se limita a BUSQUEDA_MAX_RESULTADOS para que el costo no crezca con
+    el catálogo; las páginas se sirven después como cortes de la lista.
+    """
+    filas = ejecutar_consulta(
+        f"""SELECT p.id FROM productos p WHERE {condiciones}
+            ORDER BY 2 * MATCH(p.nombre) AGAINST (%s IN BOOLEAN MODE)
+                     + MATCH(p.nombre, p.descripcion) AGAINST (%s IN BOOLEAN MODE) DESC,
+                     p.id DESC
+            LIMIT %s""",
+        (*parametros, expresion, expresion, Configuracion.BUSQUEDA_MAX_RESULTADOS),
+        obtener_todos=True
+    )
+    return None if filas is None else [fila['id'] for fila in filas]
+
+
+def productos_por_ids(columnas, ids):
+    """Carga los productos indicados respetando el orden de `ids`"""
+    if not ids:
+        return []
+    marcadores = ', '.join(['%s'] * len(ids))
+    filas = ejecutar_consulta(
+        f"""SELECT {columnas} FROM productos p LEFT JOIN categorias c ON p.categoria_id = c.id
+            WHERE p.id IN ({marcadores})""",
+        tuple(ids),
+        obtener_todos=True
+    )
+    if filas is None:
+        return None
+    por_id = {fila['id']: fila for fila in filas}
+    return [por_id[i] for i in ids if i in por_id]
@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import OrderedDict
+
+_SIN_VALOR = object()
+
+
+class CacheMemoria:
+    """
+    Caché en memoria del proceso, segura para hilos.
+
+    Cada entrada expira a los `ttl` segundos y, si se indica
+    `max_entradas`, se expulsan las menos usadas recientemente (LRU).
+    Lleva contadores de aciertos y fallos para poder dimensionarla.
+    """
+
+    def __init__(self, ttl, max_entradas=None):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self._calculando = {}
+        self.aciertos = 0
+        self.fallos = 0
+
+    def get(self, clave, defecto=None, contar=True):
+        """
+        Devuelve el valor vigente de `clave` o `defecto`. Con contar=False
+        la consulta no suma aciertos ni fallos.
+        """
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None:
+                valor, expira = entrada
+                if expira > time.monotonic():
+                    self._datos.move_to_end(clave)
+                    if contar:
+                        self.aciertos += 1
+                    return valor
+                del self._datos[clave]
+            if contar:
+                self.fallos += 1
+            return defecto
+
+    def set(self, clave, valor):
+        """Guarda `valor` en `clave`, expulsando entradas si hace falta"""
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic() + self.ttl)
+            self._datos.move_to_end(clave)
+            if self.max_entradas:
+                while len(self._datos) > self.max_entradas:
+                    self._datos.popitem(last=False)
+
+    def obtener(self, clave, calcular):
+        """
+        Devuelve el valor de `clave`, calculándolo con `calcular()` si no
+        está en caché. Los resultados None (p. ej. un error de base de
+        datos) no se guardan.
+        """
+        valor = self.get(clave, _SIN_VALOR)
+        if valor is _SIN_VALOR:
+            valor = calcular()
+            if valor is not None:
+                self.set(clave, valor)
+        return valor
+
+    def obtener_unico(self, clave, calcular):
+        """
+        Como obtener(), pero si varios hilos piden a la vez una clave
+        ausente solo uno ejecuta `calcular()`; los demás esperan su
+        resultado en lugar de repetir el trabajo (evita estampidas al
+        expirar una entrada muy pedida).
+        """
+        valor = self.get(clave, _SIN_VALOR)
+        if valor is not _SIN_VALOR:
+            return valor
+        with self._lock:
+            candado = self._calculando.setdefault(clave, threading.Lock())
+        try:
+            with candado:
+                # El fallo ya se contó en la primera consulta
+                valor = self.get(clave, _SIN_VALOR, contar=False)
+                if valor is _SIN_VALOR:
+                    valor = calcular()
+                    if valor is not None:
+                        self.set(clave, valor)
+        finally:
+            with self._lock:
+                if self._calculando.get(clave) is candado:
+                    del self._calculando[clave]
+        return valor
+
+    def invalidar(self, clave=_SIN_VALOR):
+        """Elimina una entrada, o todas si no se indica clave"""
+        with self._lock:
+            if clave is _SIN_VALOR:
+                self._datos.clear()
+            else:
+                self._datos.pop(clave, None)
+
+    def estadisticas(self):
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._datos),
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': round(self.aciertos / total, 3) if total else 0.0,
+            }
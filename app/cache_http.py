@@ -0,0 +1,143 @@
+import hashlib
+import time
+from functools import wraps
+from flask import request, session, make_response
+from cache import CacheMemoria
+from consultas import version_catalogo
+from carritos import total_articulos
+from config import Configuracion
+
+# Respuestas completas para visitantes anónimos: (cuerpo, content_type)
+_cache_paginas = CacheMemoria(ttl=Configuracion.CACHE_PAGINAS_TTL,
+                              max_entradas=Configuracion.CACHE_PAGINAS_MAX)
+
+# Con esta cabecera la petición ignora la caché de páginas (depuración)
+CABECERA_SIN_CACHE = 'X-Cache-Bypass'
+
+
+def _contexto_visitante():
+    """
+    Lo que cambia la página según quién la pide: usuario, rol y badge del
+    carrito. Un visitante anónimo con el carrito vacío devuelve None.
+    """
+    usuario_id = session.get('usuario_id')
+    articulos = total_articulos()
+    if usuario_id is None and not articulos:
+        return None
+    return (usuario_id, session.get('usuario_rol'), session.get('usuario_nombre'), articulos)
+
+
+def calcular_etag(politica, contexto, extra=None):
+    """
+    ETag de la petición actual a partir del sello del catálogo.
+
+    Los listados muestran stock, que cambia con cada pago sin tocar la
+    versión del catálogo; por eso su ETag incluye además una ventana de
+    CACHE_CATALOGO_TTL segundos, el mismo retraso que ya admite la caché
+    de listados del servidor.
+    """
+    partes = [politica, request.full_path, version_catalogo()[0], contexto, extra]
+    if extra is None:
+        partes.append(int(time.time() // Configuracion.CACHE_CATALOGO_TTL))
+    return hashlib.sha1(repr(partes).encode('utf-8')).hexdigest()
+
+
+def _clave_pagina():
+    """Ruta y query string normalizada (ordenada, sin parámetros vacíos)"""
+    consulta = tuple(sorted((clave, valor) for clave, valor in request.args.items(multi=True) if valor != ''))
+    return (version_catalogo(), request.path, consulta)
+
+
+def _pagina_en_cache(vista, args, kwargs):
+    """
+    Devuelve (respuesta, 'HIT' | 'MISS') usando la caché de páginas. Si
+    varias peticiones iguales llegan con la entrada vencida, solo una
+    ejecuta la vista y las demás reutilizan su resultado.
+    """
+    generada = []
+
+    def calcular():
+        respuesta = make_response(vista(*args, **kwargs))
+        generada.append(respuesta)
+        if respuesta.status_code != 200 or respuesta.is_streamed or session.modified:
+            return None
+        return respuesta.get_data(), respuesta.content_type
+
+    pagina = _cache_paginas.obtener_unico(_clave_pagina(), calcular)
+    if generada:
+        return generada[0], 'MISS'
+    return make_response(pagina[0], 200, {'Content-Type': pagina[1]}), 'HIT'
+
+
+def estadisticas_paginas():
+    return _cache_paginas.estadisticas()
+
+
+def _aplicar_cabeceras(respuesta, etag, max_age, privada):
+    # Débil: el mismo contenido se envía con o sin compresión
+    respuesta.set_etag(etag, weak=True)
+    if privada:
+        respuesta.cache_control.private = True
+        respuesta.cache_control.no_cache = True
+    else:
+        respuesta.cache_control.public = True
+        respuesta.cache_control.max_age = max_age
+    # Anónimos y usuarios con sesión reciben páginas distintas en la misma URL
+    respuesta.vary.add('Cookie')
+    return respuesta
+
+
+def respuesta_condicional(politica, extra=None, cache_pagina=False):
+    """
+    Decorador de GET condicional para páginas del catálogo.
+
+    Calcula el ETag antes de ejecutar la vista y, si coincide con
+    If-None-Match, responde 304 sin consultar ni renderizar nada. Las
+    respuestas llevan Cache-Control según HTTP_MAX_AGE[politica]: públicas
+    para visitantes anónimos con el carrito vacío y privadas (revalidar
+    siempre) para el resto, para que el badge del carrito y el menú de
+    usuario no se sirvan a otra persona.
+
+    Args:
+        politica: clave de Configuracion.HTTP_MAX_AGE ('catalogo', 'producto'...)
+        extra: función opcional que recibe los argumentos de la vista y
+            devuelve un sello propio del recurso (p. ej. el stock de un
+            producto); sustituye a la ventana de tiempo.
+        cache_pagina: guarda la respuesta completa de los visitantes
+            anónimos durante CACHE_PAGINAS_TTL segundos, por ruta y query
+            string. La versión del catálogo forma parte de la clave, así
+            que las escrituras del panel la invalidan. La cabecera
+            X-Cache indica HIT, MISS o BYPASS.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            # Los mensajes flash se muestran una sola vez: siempre se renderiza
+            if '_flashes' in session:
+                respuesta = make_response(vista(*args, **kwargs))
+                respuesta.cache_control.no_store = True
+                return respuesta
+
+            contexto = _contexto_visitante()
+            privada = contexto is not None
+            max_age = Configuracion.HTTP_MAX_AGE[politica]
+            etag = calcular_etag(politica, contexto, extra(*args, **kwargs) if extra else None)
+            if request.if_none_match.contains_weak(etag):
+                return _aplicar_cabeceras(make_response('', 304), etag, max_age, privada)
+
+            estado_cache = None
+            if cache_pagina and not privada and Configuracion.CACHE_PAGINAS_TTL > 0:
+                if request.headers.get(CABECERA_SIN_CACHE):
+                    estado_cache = 'BYPASS'
+                else:
+                    respuesta, estado_cache = _pagina_en_cache(vista, args, kwargs)
+            if estado_cache in (None, 'BYPASS'):
+                respuesta = make_response(vista(*args, **kwargs))
+            if estado_cache:
+                respuesta.headers['X-Cache'] = estado_cache
+            if respuesta.status_code != 200:
+                return respuesta
+            # Si la vista escribió en la sesión, la respuesta lleva Set-Cookie
+            return _aplicar_cabeceras(respuesta, etag, max_age, privada or session.modified)
+        return envoltura
+    return decorador
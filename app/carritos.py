@@ -0,0 +1,316 @@
+import threading
+import uuid
+from flask import g, session
+from db import ejecutar_consulta
+from config import Configuracion
+
+try:
+    import redis
+except ImportError:  # solo hace falta con CARRITO_ALMACEN=redis
+    redis = None
+
+
+class AlmacenCarritoMySQL:
+    """
+    Carritos en la tabla carritos_items: una fila (carrito_id, producto_id,
+    cantidad) por producto. Los datos del producto se leen al mostrar el
+    carrito, así que aquí solo se guardan las cantidades.
+    """
+
+    def obtener(self, carrito_id):
+        filas = ejecutar_consulta(
+            "SELECT producto_id, cantidad FROM carritos_items WHERE carrito_id = %s",
+            (carrito_id,),
+            obtener_todos=True,
+            preparada=True
+        ) or []
+        return {fila['producto_id']: fila['cantidad'] for fila in filas}
+
+    def guardar(self, carrito_id, cambios):
+        """Aplica {producto_id: cantidad} de una vez; cantidad 0 quita el producto"""
+        fijar = [(producto_id, cantidad) for producto_id, cantidad in cambios.items() if cantidad > 0]
+        quitar = [producto_id for producto_id, cantidad in cambios.items() if cantidad <= 0]
+        if fijar:
+            parametros = []
+            for producto_id, cantidad in fijar:
+                parametros.extend((carrito_id, producto_id, cantidad))
+            ejecutar_consulta(
+                f"""INSERT INTO carritos_items (carrito_id, producto_id, cantidad)
+                    VALUES {', '.join(['(%s, %s, %s)'] * len(fijar))}
+                    ON DUPLICATE KEY UPDATE cantidad = VALUES(cantidad)""",
+                tuple(parametros)
+            )
+        if quitar:
+            ejecutar_consulta(
+                f"""DELETE FROM carritos_items
+                    WHERE carrito_id = %s AND producto_id IN ({', '.join(['%s'] * len(quitar))})""",
+                (carrito_id, *quitar)
+            )
+
+    def agregar(self, carrito_id, cantidades):
+        """Suma varias cantidades de una vez (p. ej. al migrar un carrito)"""
+        if not cantidades:
+            return
+        valores = ', '.join(['(%s, %s, %s)'] * len(cantidades))
+        parametros = []
+        for producto_id, cantidad in cantidades.items():
+            parametros.extend((carrito_id, producto_id, cantidad))
+        ejecutar_consulta(
+            f"""INSERT INTO carritos_items (carrito_id, producto_id, cantidad) VALUES {valores}
+                ON DUPLICATE KEY UPDATE cantidad = cantidad + VALUES(cantidad)""",
+            tuple(parametros)
+        )
+
+    def vaciar(self, carrito_id):
+        ejecutar_consulta("DELETE FROM carritos_items WHERE carrito_id = %s", (carrito_id,))
+
+    def purgar(self, dias):
+        """Borra los carritos abandonados hace más de `dias` días"""
+        return ejecutar_consulta(
+            "DELETE FROM carritos_items WHERE actualizado < NOW() - INTERVAL %s DAY",
+            (dias,)
+        )
+
+
+class AlmacenCarritoRedis:
+    """
+    Carritos en Redis (o cualquier servidor compatible): un hash por
+    carrito con producto_id -> cantidad, que expira a los CARRITO_DIAS
+    días sin cambios.
+    """
+
+    def __init__(self, url, dias, prefijo='carrito:'):
+        if redis is None:
+            raise RuntimeError("CARRITO_ALMACEN=redis requiere el paquete 'redis' (pip install redis)")
+        self.cliente = redis.Redis.from_url(url)
+        self.expira = dias * 86400
+        self.prefijo = prefijo
+
+    def _clave(self, carrito_id):
+        return f'{self.prefijo}{carrito_id}'
+
+    def obtener(self, carrito_id):
+        datos = self.cliente.hgetall(self._clave(carrito_id))
+        return {int(producto_id): int(cantidad) for producto_id, cantidad in datos.items()}
+
+    def guardar(self, carrito_id, cambios):
+        clave = self._clave(carrito_id)
+        fijar = {producto_id: cantidad for producto_id, cantidad in cambios.items() if cantidad > 0}
+        quitar = [producto_id for producto_id, cantidad in cambios.items() if cantidad <= 0]
+        with self.cliente.pipeline() as tuberia:
+            if fijar:
+                tuberia.hset(clave, mapping=fijar)
+            if quitar:
+                tuberia.hdel(clave, *quitar)
+            tuberia.expire(clave, self.expira)
+            tuberia.execute()
+
+    def agregar(self, carrito_id, cantidades):
+        if not cantidades:
+            return
+        clave = self._clave(carrito_id)
+        with self.cliente.pipeline() as tuberia:
+            for producto_id, cantidad in cantidades.items():
+                tuberia.hincrby(clave, producto_id, cantidad)
+            tuberia.expire(clave, self.expira)
+            tuberia.execute()
+
+    def vaciar(self, carrito_id):
+        self.cliente.delete(self._clave(carrito_id))
+
+    def purgar(self, dias):
+        """Redis expira los carritos por sí solo"""
+        return 0
+
+
+_lock = threading.Lock()
+_almacen = None
+
+
+def almacen():
+    """Almacén de carritos configurado en CARRITO_ALMACEN (uno por proceso)"""
+    global _almacen
+    if _almacen is None:
+        with _lock:
+            if _almacen is None:
+                if Configuracion.CARRITO_ALMACEN == 'redis':
+                    _almacen = AlmacenCarritoRedis(Configuracion.CARRITO_REDIS_URL, Configuracion.CARRITO_DIAS)
+                else:
+                    _almacen = AlmacenCarritoMySQL()
+    return _almacen
+
+
+def _id_carrito(crear=False):
+    """
+    Id del carrito del visitante, guardado en la sesión.
+
+    La primera vez que llega una sesión con el carrito completo en la
+    cookie (versiones anteriores), sus cantidades se pasan al almacén y
+    se quita de la cookie.
+    """
+    carrito_id = session.get('carrito_id')
+    anterior = session.pop('carrito', None)
+    if carrito_id is None and (crear or anterior):
+        carrito_id = session['carrito_id'] = uuid.uuid4().hex
+    if anterior:
+        almacen().agregar(carrito_id, {
+            int(item['producto_id']): int(item['cantidad']) for item in anterior.values()
+        })
+        session.pop('carrito_articulos', None)
+    return carrito_id
+
+
+class Carrito:
+    """
+    Carrito de la petición actual.
+
+    Lee las cantidades del almacén una sola vez y carga los productos que
+    hagan falta en una sola consulta. El número de artículos y el total se
+    ajustan con cada cambio en lugar de recorrer el carrito otra vez, y
+    guardar() escribe todos los cambios en el almacén de una vez.
+    """
+
+    def __init__(self, carrito_id, cantidades):
+        self.carrito_id = carrito_id
+        self.cantidades = cantidades
+        self.articulos = sum(cantidades.values())
+        self.productos = {}
+        # Ids ya consultados, activos o no (los activos quedan en productos)
+        self._consultados = set()
+        self._total = None
+        self._cambios = {}
+
+    def cargar_productos(self, ids=None):
+        """
+        Carga los productos activos de `ids` (por defecto, los del carrito)
+        que aún no se hayan leído, y devuelve {producto_id: producto}.
+        """
+        ids = self.cantidades if ids is None else ids
+        faltantes = [producto_id for producto_id in ids if producto_id not in self.productos]
+        if faltantes:
+            filas = ejecutar_consulta(
+                f"""SELECT id, nombre, precio, stock, imagen FROM productos
+                    WHERE id IN ({', '.join(['%s'] * len(faltantes))}) AND activo = 1""",
+                tuple(faltantes),
+                obtener_todos=True,
+                preparada=len(faltantes) == 1
+            )
+            if filas is not None:
+                self._consultados.update(faltantes)
+            for fila in filas or []:
+                self.productos[fila['id']] = {**fila, 'precio': float(fila['precio'])}
+        return self.productos
+
+    def quitar_inactivos(self):
+        """
+        Quita del carrito los productos desactivados o borrados, para que
+        el número de artículos coincida con items() y con el pedido.
+        """
+        if not self.cantidades:
+            return
+        self.cargar_productos()
+        inactivos = [
+            producto_id for producto_id in self.cantidades
+            if producto_id in self._consultados and producto_id not in self.productos
+        ]
+        for producto_id in inactivos:
+            self.fijar(producto_id, 0)
+        if inactivos:
+            self.guardar()
+
+    @property
+    def total(self):
+        """Importe del carrito (se calcula una vez y luego se ajusta)"""
+        if self._total is None:
+            self.cargar_productos()
+            self._total = sum(
+                self.productos[producto_id]['precio'] * cantidad
+                for producto_id, cantidad in self.cantidades.items() if producto_id in self.productos
+            )
+        return self._total
+
+    def subtotal(self, producto_id):
+        producto = self.productos.get(producto_id)
+        return producto['precio'] * self.cantidades.get(producto_id, 0) if producto else 0
+
+    def fijar(self, producto_id, cantidad):
+        """Deja `cantidad` unidades del producto; 0 o menos lo quita"""
+        cantidad = max(cantidad, 0)
+        anterior = self.cantidades.get(producto_id, 0)
+        if cantidad:
+            self.cantidades[producto_id] = cantidad
+        else:
+            self.cantidades.pop(producto_id, None)
+        diferencia = cantidad - anterior
+        self.articulos += diferencia
+        if self._total is not None:
+            producto = self.cargar_productos([producto_id]).get(producto_id)
+            if producto:
+                self._total += diferencia * producto['precio']
+        self._cambios[producto_id] = cantidad
+
+    def items(self):
+        """
+        Productos del carrito con sus datos actuales. Los desactivados o
+        borrados se omiten.
+
+        Returns:
+            {str(producto_id): {producto_id, nombre, precio, imagen, stock, cantidad}}
+        """
+        self.cargar_productos()
+        return {
+            str(producto_id): {
+                'producto_id': producto_id,
+                'nombre': self.productos[producto_id]['nombre'],
+                'precio': self.productos[producto_id]['precio'],
+                'imagen': self.productos[producto_id]['imagen'],
+                'stock': self.productos[producto_id]['stock'],
+                'cantidad': cantidad,
+            }
+            for producto_id, cantidad in self.cantidades.items() if producto_id in self.productos
+        }
+
+    def guardar(self):
+        """Escribe los cambios pendientes y actualiza el contador de la sesión"""
+        if self._cambios:
+            if self.carrito_id is None:
+                self.carrito_id = _id_carrito(crear=True)
+            almacen().guardar(self.carrito_id, self._cambios)
+            self._cambios = {}
+        session['carrito_articulos'] = self.articulos
+
+    def vaciar(self):
+        if self.carrito_id:
+            almacen().vaciar(self.carrito_id)
+        self.cantidades = {}
+        self.articulos = 0
+        self._total = 0
+        self._cambios = {}
+        session['carrito_articulos'] = 0
+
+
+def carrito_actual():
+    """Carrito del visitante, cargado una vez por petición"""
+    carrito = g.get('_carrito')
+    if carrito is None:
+        carrito_id = _id_carrito()
+        carrito = g._carrito = Carrito(carrito_id, almacen().obtener(carrito_id) if carrito_id else {})
+        carrito.quitar_inactivos()
+        session['carrito_articulos'] = carrito.articulos
+    return carrito
+
+
+def total_articulos():
+    """
+    Unidades en el carrito para el badge de la barra. Sale del contador
+    de la sesión, así que renderizar una página no lee el almacén.
+    """
+    if 'carrito_articulos' not in session:
+        if 'carrito_id' not in session and 'carrito' not in session:
+            return 0
+        carrito_actual()
+    return session['carrito_articulos']
+
+
+def vaciar_carrito():
+    carrito_actual().vaciar()
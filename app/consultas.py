@@ -0,0 +1,89 @@
+import threading
+from db import ejecutar_consulta
+from cache import CacheMemoria
+from config import Configuracion
+
+_lock = threading.Lock()
+_cambios_locales = 0
+
+# Versión compartida del catálogo, leída como mucho cada CACHE_VERSION_TTL segundos
+_cache_version = CacheMemoria(ttl=Configuracion.CACHE_VERSION_TTL)
+
+# Las categorías cambian pocas veces al mes; el TTL limita cuánto tarda
+# en verse un cambio si no llega a propagarse la versión del catálogo
+_cache_categorias = CacheMemoria(ttl=Configuracion.CACHE_CATEGORIAS_TTL, max_entradas=4)
+
+# Resultados de listados del catálogo por combinación de filtros
+_cache_catalogo = CacheMemoria(ttl=Configuracion.CACHE_CATALOGO_TTL,
+                               max_entradas=Configuracion.CACHE_CATALOGO_MAX)
+
+
+def _leer_version_compartida():
+    fila = ejecutar_consulta(
+        "SELECT version FROM versiones_cache WHERE nombre = %s",
+        ('catalogo',),
+        obtener_uno=True,
+        preparada=True
+    )
+    return fila['version'] if fila else 0
+
+
+def version_catalogo():
+    """
+    Sello de versión del catálogo (productos y categorías).
+
+    Combina el contador de la tabla versiones_cache, que ven todos los
+    workers, con un contador local que invalida al instante las cachés
+    de este proceso.
+    """
+    return (_cache_version.obtener('catalogo', _leer_version_compartida), _cambios_locales)
+
+
+def invalidar_catalogo():
+    """Incrementa la versión del catálogo tras una escritura de productos o categorías"""
+    global _cambios_locales
+    with _lock:
+        _cambios_locales += 1
+    ejecutar_consulta(
+        """INSERT INTO versiones_cache (nombre, version) VALUES (%s, 1)
+           ON DUPLICATE KEY UPDATE version = version + 1""",
+        ('catalogo',)
+    )
+    _cache_version.invalidar()
+    _cache_catalogo.invalidar()
+
+
+def cache_catalogo(clave, calcular):
+    """
+    Devuelve el resultado en caché de una consulta del catálogo.
+
+    `clave` debe ser una tupla con los filtros ya normalizados; la
+    versión del catálogo se añade a la clave, así que una escritura
+    invalida todas las entradas anteriores.
+    """
+    return _cache_catalogo.obtener((version_catalogo(), *clave), calcular)
+
+
+def obtener_categorias():
+    """Lista de categorías ordenada por nombre (en caché)"""
+    return _cache_categorias.obtener(version_catalogo(), lambda: ejecutar_consulta(
+        "SELECT * FROM categorias ORDER BY nombre",
+        obtener_todos=True,
+        preparada=True
+    )) or []
+
+
+def invalidar_categorias():
+    """Descarta la lista de categorías en caché tras un cambio"""
+    _cache_categorias.invalidar()
+    # Los listados del catálogo incluyen el nombre de la categoría
+    invalidar_catalogo()
+
+
+def estadisticas_caches():
+    """Aciertos y fallos de las cachés del proceso"""
+    return {
+        'version': _cache_version.estadisticas(),
+        'categorias': _cache_categorias.estadisticas(),
+        'catalogo': _cache_catalogo.estadisticas(),
+    }
@@ -0,0 +1,49 @@
+from jinja2 import nodes
+from jinja2.ext import Extension
+from cache import CacheMemoria
+from config import Configuracion
+
+# HTML ya renderizado de fragmentos de plantilla (tarjetas de producto)
+_cache_fragmentos = CacheMemoria(ttl=Configuracion.CACHE_FRAGMENTOS_TTL,
+                                 max_entradas=Configuracion.CACHE_FRAGMENTOS_MAX)
+
+
+class CacheFragmentos(Extension):
+    """
+    Bloque {% cache_fragmento clave, ... %}...{% endcache_fragmento %}.
+
+    Guarda el HTML del bloque bajo la tupla de expresiones indicadas y lo
+    reutiliza mientras no cambie ninguna. La clave debe incluir todo lo
+    que altere el resultado; para un producto, su id y su columna
+    `version`, que se incrementa al editarlo:
+
+        {% cache_fragmento 'tarjeta', producto.id, producto.version, producto.stock > 0 %}
+    """
+    tags = {'cache_fragmento'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        partes = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            partes.append(parser.parse_expression())
+        cuerpo = parser.parse_statements(('name:endcache_fragmento',), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method('_renderizar', [nodes.Tuple(partes, 'load')]), [], [], cuerpo
+        ).set_lineno(lineno)
+
+    def _renderizar(self, clave, caller):
+        return _cache_fragmentos.obtener(clave, caller)
+
+
+def registrar_fragmentos(app):
+    """Activa el bloque cache_fragmento en las plantillas de la aplicación"""
+    app.jinja_env.add_extension(CacheFragmentos)
+
+
+def invalidar_fragmentos():
+    """Descarta todos los fragmentos del proceso (p. ej. tras cambiar plantillas)"""
+    _cache_fragmentos.invalidar()
+
+
+def estadisticas_fragmentos():
+    return _cache_fragmentos.estadisticas()
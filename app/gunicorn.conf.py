@@ -0,0 +1,45 @@
+"""
+Configuración de gunicorn para producción (todas las opciones se leen
+del entorno).
+
+Cada worker es un proceso con su propio pool de conexiones MySQL, así
+que el máximo de conexiones al primario es
+GUNICORN_WORKERS * (DB_POOL_TAMANO + DB_POOL_DESBORDE); debe quedar por
+debajo de max_connections del servidor.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Procesos y hilos: los hilos atienden peticiones que esperan a MySQL o
+# a bcrypt sin bloquear el worker completo
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Conexiones persistentes detrás del proxy y reciclado periódico de
+# workers (acota fugas de memoria); el jitter evita reinicios simultáneos
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+# Cargar la aplicación una vez en el maestro antes de hacer fork
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+
+
+def post_fork(server, worker):
+    """Cada worker empieza sin conexiones ni hilos heredados del maestro"""
+    import db
+    import imagenes
+    import seguridad
+    db.reiniciar_pool()
+    seguridad.reiniciar()
+    imagenes.reiniciar()
+    server.log.info("Worker %s listo (pools reiniciados)", worker.pid)
@@ -0,0 +1,259 @@
+import hashlib
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from flask import request, url_for
+from cache import CacheMemoria
+from db import ejecutar_consulta
+from config import Configuracion
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # sin Pillow se sirven los originales
+    Image = None
+
+SIN_IMAGEN = 'sin_imagen.png'
+# Nombres generados: <hash>.<ext> (original) y <hash>-<ancho>.webp (variantes)
+_RE_NOMBRE_HASH = re.compile(r'^[0-9a-f]{20}(?:-\d+)?\.\w+$')
+_UN_ANIO = 365 * 24 * 3600
+
+_lock = threading.Lock()
+_ejecutor = None
+_ejecutor_pid = None
+_en_proceso = {}
+# nombre original -> anchos con su variante ya escrita (frozenset)
+_variantes_listas = CacheMemoria(ttl=Configuracion.IMAGENES_VARIANTES_TTL,
+                                 max_entradas=Configuracion.IMAGENES_VARIANTES_MAX)
+
+
+def _obtener_ejecutor():
+    """
+    Pool de procesos que redimensiona las imágenes, creado al primer uso
+    en cada proceso. Usa 'spawn' para no hacer fork de un worker con
+    hilos y conexiones abiertas.
+    """
+    global _ejecutor, _ejecutor_pid
+    if _ejecutor_pid != os.getpid():
+        with _lock:
+            if _ejecutor_pid != os.getpid():
+                _ejecutor = ProcessPoolExecutor(max_workers=Configuracion.IMAGENES_PROCESOS,
+                                                mp_context=multiprocessing.get_context('spawn'))
+                _ejecutor_pid = os.getpid()
+    return _ejecutor
+
+
+def reiniciar():
+    """Descarta el pool actual; el siguiente uso crea uno nuevo"""
+    global _ejecutor, _ejecutor_pid
+    with _lock:
+        anterior = _ejecutor if _ejecutor_pid == os.getpid() else None
+        _ejecutor = None
+        _ejecutor_pid = None
+    # Fuera del lock: al terminar, las tareas pendientes lo necesitan
+    if anterior is not None:
+        anterior.shutdown(wait=True)
+    with _lock:
+        _en_proceso.clear()
+
+
+def nombre_variante(nombre, ancho):
+    """'ab12...ef.jpg' -> 'ab12...ef-400.webp'"""
+    return f"{nombre.rsplit('.', 1)[0]}-{ancho}.webp"
+
+
+def _generar_variantes(ruta_original, anchos, calidad):
+    """
+    Genera las variantes WebP de una imagen (se ejecuta en el pool de
+    procesos). Cada archivo se escribe aparte y se renombra al final, así
+    que nunca se sirve una variante a medias.
+    """
+    carpeta = os.path.dirname(ruta_original)
+    nombre = os.path.basename(ruta_original)
+    with Image.open(ruta_original) as original:
+        imagen = ImageOps.exif_transpose(original)
+        imagen = imagen.convert('RGBA' if imagen.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        generadas = []
+        for ancho in anchos:
+            copia = imagen.copy()
+            copia.thumbnail((ancho, ancho * 4))
+            destino = os.path.join(carpeta, nombre_variante(nombre, ancho))
+            temporal = f'{destino}.{os.getpid()}.tmp'
+            copia.save(temporal, 'WEBP', quality=calidad, method=4)
+            os.replace(temporal, destino)
+            generadas.append(os.path.basename(destino))
+    return generadas
+
+
+def _variantes_pendientes(nombre):
+    return [
+        ancho for ancho in Configuracion.IMAGENES_TAMANOS.values()
+        if not os.path.exists(os.path.join(Configuracion.CARPETA_UPLOADS, nombre_variante(nombre, ancho)))
+    ]
+
+
+def _anchos_listos(nombre):
+    """Anchos de `nombre` cuya variante existe; el disco se mira una vez por TTL"""
+    return _variantes_listas.obtener(nombre, lambda: frozenset(
+        ancho for ancho in Configuracion.IMAGENES_TAMANOS.values()
+        if os.path.exists(os.path.join(Configuracion.CARPETA_UPLOADS, nombre_variante(nombre, ancho)))
+    ))
+
+
+def olvidar_imagen(nombre):
+    """Descarta lo que se sabe de las variantes de `nombre` (p. ej. al cambiar la imagen)"""
+    if nombre:
+        _variantes_listas.invalidar(nombre)
+
+
+def _al_terminar(nombre):
+    def callback(futuro):
+        with _lock:
+            _en_proceso.pop(nombre, None)
+        if futuro.exception():
+            print(f"Error al procesar la imagen {nombre}: {futuro.exception()}")
+        else:
+            _variantes_listas.set(nombre, frozenset(Configuracion.IMAGENES_TAMANOS.values()))
+    return callback
+
+
+def procesar(nombre):
+    """
+    Encola la generación de las variantes que falten de `nombre` y
+    devuelve el futuro (None si no hay nada que hacer o no hay Pillow).
+    """
+    if Image is None:
+        return None
+    anchos = _variantes_pendientes(nombre)
+    if not anchos:
+        _variantes_listas.set(nombre, frozenset(Configuracion.IMAGENES_TAMANOS.values()))
+        return None
+    olvidar_imagen(nombre)
+    ejecutor = _obtener_ejecutor()
+    with _lock:
+        # La misma imagen subida dos veces seguidas se procesa una sola vez
+        futuro = _en_proceso.get(nombre)
+        if futuro is None:
+            futuro = _en_proceso[nombre] = ejecutor.submit(
+                _generar_variantes, os.path.join(Configuracion.CARPETA_UPLOADS, nombre),
+                anchos, Configuracion.IMAGENES_CALIDAD
+            )
+            nuevo = True
+        else:
+            nuevo = False
+    if nuevo:
+        futuro.add_done_callback(_al_terminar(nombre))
+    return futuro
+
+
+def _nombre_por_contenido(datos, extension):
+    extension = 'jpg' if extension == 'jpeg' else extension
+    return f'{hashlib.sha256(datos).hexdigest()[:20]}.{extension}'
+
+
+def guardar_subida(archivo):
+    """
+    Guarda una imagen subida con un nombre derivado de su contenido y
+    encola sus variantes sin esperar a que terminen.
+
+    Dos subidas con el mismo contenido comparten archivo y variantes.
+
+    Returns:
+        Nombre del archivo guardado (lo que va en productos.imagen).
+    """
+    datos = archivo.read()
+    extension = archivo.filename.rsplit('.', 1)[1].lower()
+    nombre = _nombre_por_contenido(datos, extension)
+    ruta = os.path.join(Configuracion.CARPETA_UPLOADS, nombre)
+    if not os.path.exists(ruta):
+        os.makedirs(Configuracion.CARPETA_UPLOADS, exist_ok=True)
+        temporal = f'{ruta}.{os.getpid()}.tmp'
+        with open(temporal, 'wb') as destino:
+            destino.write(datos)
+        os.replace(temporal, ruta)
+    procesar(nombre)
+    return nombre
+
+
+def imagen_url(nombre, vista='miniatura'):
+    """
+    URL de la imagen de un producto para una vista ('miniatura' o
+    'detalle'): la variante WebP de ese tamaño si ya existe, si no el
+    original. Sin nombre (imagen NULL) se usa SIN_IMAGEN.
+
+    Las variantes listas se recuerdan por imagen durante
+    IMAGENES_VARIANTES_TTL segundos: el pool las anota al escribirlas y
+    los demás workers las descubren al vencer la entrada.
+    """
+    nombre = nombre or SIN_IMAGEN
+    ancho = Configuracion.IMAGENES_TAMANOS.get(vista)
+    if ancho and _RE_NOMBRE_HASH.match(nombre) and ancho in _anchos_listos(nombre):
+        return url_for('static', filename='uploads/' + nombre_variante(nombre, ancho))
+    return url_for('static', filename='uploads/' + nombre)
+
+
+def _cache_inmutable(respuesta):
+    """Los archivos con hash en el nombre nunca cambian: caché de un año"""
+    if request.endpoint == 'static' and respuesta.status_code == 200:
+        archivo = (request.view_args or {}).get('filename', '')
+        if archivo.startswith('uploads/') and _RE_NOMBRE_HASH.match(archivo[len('uploads/'):]):
+            respuesta.cache_control.no_cache = None
+            respuesta.cache_control.public = True
+            respuesta.cache_control.max_age = _UN_ANIO
+            respuesta.cache_control.immutable = True
+    return respuesta
+
+
+def registrar_imagenes(app):
+    """Expone imagen_url() en las plantillas y cachea los archivos con hash"""
+    app.add_template_global(imagen_url)
+    app.after_request(_cache_inmutable)
+
+
+def rellenar_existentes():
+    """
+    Pasa las imágenes subidas antes de este sistema a nombres con hash y
+    genera las variantes que falten de todas las imágenes en uso.
+
+    Returns:
+        (renombradas, procesadas)
+    """
+    if Image is None:
+        raise RuntimeError("Procesar imágenes requiere Pillow (pip install Pillow)")
+    filas = ejecutar_consulta(
+        "SELECT DISTINCT imagen FROM productos WHERE imagen IS NOT NULL AND imagen <> %s",
+        (SIN_IMAGEN,),
+        obtener_todos=True
+    ) or []
+    renombradas = 0
+    futuros = []
+    for fila in filas:
+        nombre = fila['imagen']
+        ruta = os.path.join(Configuracion.CARPETA_UPLOADS, nombre)
+        if not os.path.exists(ruta):
+            print(f"⚠ No existe {nombre}, se omite")
+            continue
+        if not _RE_NOMBRE_HASH.match(nombre):
+            with open(ruta, 'rb') as archivo:
+                datos = archivo.read()
+            extension = nombre.rsplit('.', 1)[1].lower() if '.' in nombre else 'jpg'
+            nuevo = _nombre_por_contenido(datos, extension)
+            nueva_ruta = os.path.join(Configuracion.CARPETA_UPLOADS, nuevo)
+            if not os.path.exists(nueva_ruta):
+                with open(nueva_ruta, 'wb') as destino:
+                    destino.write(datos)
+            ejecutar_consulta("UPDATE productos SET imagen = %s WHERE imagen = %s", (nuevo, nombre))
+            renombradas += 1
+            nombre = nuevo
+        futuro = procesar(nombre)
+        if futuro:
+            futuros.append((nombre, futuro))
+    procesadas = 0
+    for nombre, futuro in futuros:
+        try:
+            futuro.result()
+            procesadas += 1
+        except Exception as e:
+            print(f"⚠ {nombre}: {e}")
+    return renombradas, procesadas
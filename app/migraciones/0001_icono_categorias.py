@@ -0,0 +1,20 @@
+"""Columna icono en categorias, con íconos por defecto para las categorías iniciales"""
+from migraciones import existe_columna
+
+ICONOS_DEFAULT = {
+    'Electrónica': 'bi-cpu', 'Electronica': 'bi-cpu',
+    'Ropa': 'bi-handbag',
+    'Hogar': 'bi-house-heart',
+    'Deportes': 'bi-dribbble',
+    'Libros': 'bi-book'
+}
+
+
+def aplicar(cursor):
+    if existe_columna(cursor, 'categorias', 'icono'):
+        return
+    cursor.execute("ALTER TABLE categorias ADD COLUMN icono VARCHAR(50) DEFAULT 'bi-tag'")
+    cursor.executemany(
+        "UPDATE categorias SET icono = %s WHERE nombre = %s AND (icono IS NULL OR icono = 'bi-tag')",
+        [(icono, nombre) for nombre, icono in ICONOS_DEFAULT.items()]
+    )
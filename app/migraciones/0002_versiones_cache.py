@@ -0,0 +1,11 @@
+"""Tabla de versiones para invalidar las cachés en memoria entre workers"""
+
+
+def aplicar(cursor):
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS versiones_cache (
+               nombre VARCHAR(50) PRIMARY KEY,
+               version BIGINT NOT NULL DEFAULT 0
+           ) ENGINE=InnoDB"""
+    )
+    cursor.execute("INSERT IGNORE INTO versiones_cache (nombre, version) VALUES ('catalogo', 0)")
@@ -0,0 +1,31 @@
+"""Tablas de resumen de ventas del panel, llenadas a partir de los pedidos existentes"""
+from resumen_ventas import reconstruir_resumenes
+
+
+def aplicar(cursor):
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS resumen_ventas (
+               id TINYINT PRIMARY KEY,
+               total_ventas DECIMAL(14, 2) NOT NULL DEFAULT 0,
+               total_pedidos INT NOT NULL DEFAULT 0
+           ) ENGINE=InnoDB"""
+    )
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS resumen_ventas_mensuales (
+               mes CHAR(7) PRIMARY KEY,
+               total_ventas DECIMAL(14, 2) NOT NULL DEFAULT 0,
+               total_pedidos INT NOT NULL DEFAULT 0
+           ) ENGINE=InnoDB"""
+    )
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS resumen_ventas_productos (
+               producto_id INT PRIMARY KEY,
+               total_vendido INT NOT NULL DEFAULT 0,
+               total_ingresos DECIMAL(14, 2) NOT NULL DEFAULT 0,
+               INDEX idx_resumen_vendido (total_vendido),
+               FOREIGN KEY (producto_id) REFERENCES productos(id) ON DELETE CASCADE
+           ) ENGINE=InnoDB"""
+    )
+    cursor.execute("SELECT id FROM resumen_ventas WHERE id = 1")
+    if cursor.fetchone() is None:
+        reconstruir_resumenes()
@@ -0,0 +1,15 @@
+"""Carritos guardados en el servidor"""
+
+
+def aplicar(cursor):
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS carritos_items (
+               carrito_id CHAR(32) NOT NULL,
+               producto_id INT NOT NULL,
+               cantidad INT NOT NULL,
+               actualizado DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+               PRIMARY KEY (carrito_id, producto_id),
+               INDEX idx_carritos_actualizado (actualizado),
+               FOREIGN KEY (producto_id) REFERENCES productos(id) ON DELETE CASCADE
+           ) ENGINE=InnoDB"""
+    )
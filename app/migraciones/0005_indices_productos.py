@@ -0,0 +1,16 @@
+"""Índices para la paginación por cursor y la búsqueda FULLTEXT del catálogo"""
+from migraciones import existe_indice
+
+INDICES = {
+    'idx_productos_activo_fecha': "INDEX idx_productos_activo_fecha ON productos(activo, fecha_creacion, id)",
+    'idx_productos_categoria_fecha':
+        "INDEX idx_productos_categoria_fecha ON productos(categoria_id, activo, fecha_creacion, id)",
+    'ft_productos_nombre': "FULLTEXT INDEX ft_productos_nombre ON productos(nombre)",
+    'ft_productos_busqueda': "FULLTEXT INDEX ft_productos_busqueda ON productos(nombre, descripcion)",
+}
+
+
+def aplicar(cursor):
+    for nombre, definicion in INDICES.items():
+        if not existe_indice(cursor, 'productos', nombre):
+            cursor.execute(f"CREATE {definicion}")
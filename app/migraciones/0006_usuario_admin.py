@@ -0,0 +1,12 @@
+"""Usuario administrador inicial con contraseña encriptada con bcrypt"""
+from seguridad import generar_hash
+
+
+def aplicar(cursor):
+    cursor.execute("SELECT id FROM usuarios WHERE email = %s", ('admin@tienda.com',))
+    if cursor.fetchone():
+        return
+    cursor.execute(
+        "INSERT INTO usuarios (nombre, email, password, rol) VALUES (%s, %s, %s, 'admin')",
+        ('Administrador', 'admin@tienda.com', generar_hash('admin123'))
+    )
@@ -0,0 +1,7 @@
+"""Columna version en productos: clave de la caché de tarjetas renderizadas"""
+from migraciones import existe_columna
+
+
+def aplicar(cursor):
+    if not existe_columna(cursor, 'productos', 'version'):
+        cursor.execute("ALTER TABLE productos ADD COLUMN version INT NOT NULL DEFAULT 1 AFTER activo")
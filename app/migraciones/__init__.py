@@ -0,0 +1,132 @@
+"""
+Migraciones versionadas del esquema.
+
+Cada migración es un módulo de este paquete con nombre NNNN_descripcion.py
+y una función aplicar(cursor). Se aplican en orden de número y cada una
+queda registrada en la tabla schema_version, así que solo se ejecuta una
+vez por base de datos. Las que recogen cambios anteriores a este sistema
+comprueban antes si el objeto ya existe (las bases creadas con
+database/schema.sql ya los tienen).
+
+Se ejecutan con el comando `flask migrar`, nunca al arrancar los
+workers. Un bloqueo de MySQL (GET_LOCK) garantiza que, si varios nodos
+lo lanzan a la vez, solo uno migra y los demás esperan a que termine.
+"""
+import importlib
+import os
+import re
+import time
+from db import obtener_conexion
+
+NOMBRE_BLOQUEO = 'ecommerce_migraciones'
+_RE_MIGRACION = re.compile(r'^(\d{4})_(\w+)\.py$')
+
+
+def listar_migraciones():
+    """[(version, nombre_modulo)] de las migraciones disponibles, en orden"""
+    carpeta = os.path.dirname(os.path.abspath(__file__))
+    migraciones = []
+    for archivo in os.listdir(carpeta):
+        coincidencia = _RE_MIGRACION.match(archivo)
+        if coincidencia:
+            migraciones.append((int(coincidencia.group(1)), archivo[:-3]))
+    return sorted(migraciones)
+
+
+def esperar_base_datos(intentos=30, pausa=2):
+    """Espera a que MySQL acepte conexiones (útil al levantar contenedores)"""
+    for intento in range(intentos):
+        conexion = obtener_conexion()
+        if conexion:
+            return conexion
+        print(f"Esperando conexión a la base de datos... intento {intento + 1}")
+        time.sleep(pausa)
+    raise RuntimeError("No se pudo conectar a la base de datos")
+
+
+def _crear_tabla_versiones(cursor):
+    cursor.execute(
+        """CREATE TABLE IF NOT EXISTS schema_version (
+               version INT PRIMARY KEY,
+               nombre VARCHAR(100) NOT NULL,
+               aplicada DATETIME DEFAULT CURRENT_TIMESTAMP
+           ) ENGINE=InnoDB"""
+    )
+
+
+def versiones_aplicadas(cursor):
+    _crear_tabla_versiones(cursor)
+    cursor.execute("SELECT version FROM schema_version")
+    return {fila['version'] for fila in cursor.fetchall()}
+
+
+def migrar(espera_bloqueo=300):
+    """
+    Aplica las migraciones pendientes en orden.
+
+    Returns:
+        Lista de los nombres de las migraciones aplicadas.
+
+    Raises:
+        RuntimeError: si no se obtiene el bloqueo a tiempo.
+        mysql.connector.Error: si falla una migración; las anteriores
+            quedan registradas y la fallida se reintenta la próxima vez.
+    """
+    conexion = esperar_base_datos()
+    cursor = conexion.cursor(dictionary=True, buffered=True)
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, %s) AS obtenido", (NOMBRE_BLOQUEO, espera_bloqueo))
+        if cursor.fetchone()['obtenido'] != 1:
+            raise RuntimeError("Otro proceso está migrando la base de datos")
+        try:
+            aplicadas = versiones_aplicadas(cursor)
+            nuevas = []
+            for version, modulo in listar_migraciones():
+                if version in aplicadas:
+                    continue
+                migracion = importlib.import_module(f'{__name__}.{modulo}')
+                print(f"→ Aplicando {modulo}")
+                migracion.aplicar(cursor)
+                cursor.execute(
+                    "INSERT INTO schema_version (version, nombre) VALUES (%s, %s)",
+                    (version, modulo)
+                )
+                nuevas.append(modulo)
+            return nuevas
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (NOMBRE_BLOQUEO,))
+            cursor.fetchall()
+    finally:
+        cursor.close()
+        conexion.close()
+
+
+def estado():
+    """[(version, nombre_modulo, aplicada)] de todas las migraciones"""
+    conexion = esperar_base_datos()
+    cursor = conexion.cursor(dictionary=True, buffered=True)
+    try:
+        aplicadas = versiones_aplicadas(cursor)
+    finally:
+        cursor.close()
+        conexion.close()
+    return [(version, modulo, version in aplicadas) for version, modulo in listar_migraciones()]
+
+
+def existe_columna(cursor, tabla, columna):
+    cursor.execute(
+        """SELECT 1 FROM information_schema.columns
+           WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s""",
+        (tabla, columna)
+    )
+    return cursor.fetchone() is not None
+
+
+def existe_indice(cursor, tabla, indice):
+    cursor.execute(
+        """SELECT 1 FROM information_schema.statistics
+           WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+           LIMIT 1""",
+        (tabla, indice)
+    )
+    return cursor.fetchone() is not None
@@ -0,0 +1,156 @@
+import logging
+import re
+import threading
+import time
+from flask import g, request, has_app_context, has_request_context
+from config import Configuracion
+
+logger = logging.getLogger('perfilador')
+
+_RE_CADENAS = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_RE_NUMEROS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_LISTAS = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+_RE_ESPACIOS = re.compile(r"\s+")
+
+_lock = threading.Lock()
+_por_endpoint = {}
+
+
+def normalizar_sql(consulta):
+    """
+    Reduce una consulta a su forma: sin literales ni espacios repetidos.
+
+    Dos ejecuciones de la misma sentencia con distintos parámetros
+    producen la misma forma, lo que permite detectar patrones N+1.
+    """
+    forma = _RE_CADENAS.sub('?', consulta)
+    forma = _RE_NUMEROS.sub('?', forma)
+    forma = forma.replace('%s', '?')
+    forma = _RE_LISTAS.sub('(?)', forma)
+    return _RE_ESPACIOS.sub(' ', forma).strip()
+
+
+def registrar_consulta(consulta, duracion):
+    """Registra una consulta ejecutada en el perfil de la petición actual"""
+    duracion_ms = duracion * 1000
+    if duracion_ms >= Configuracion.PERFIL_UMBRAL_LENTA_MS:
+        logger.warning("Consulta lenta (%.1f ms): %s", duracion_ms, normalizar_sql(consulta))
+
+    # También en el contexto de aplicación de las tareas de consultar_en_paralelo()
+    if not has_app_context():
+        return
+    perfil = g.get('_perfil_db')
+    if perfil is None:
+        perfil = g._perfil_db = {'consultas': 0, 'tiempo': 0.0, 'formas': {}}
+    perfil['consultas'] += 1
+    perfil['tiempo'] += duracion
+    forma = normalizar_sql(consulta)
+    entrada = perfil['formas'].setdefault(forma, [0, 0.0])
+    entrada[0] += 1
+    entrada[1] += duracion
+
+
+def fusionar_perfil(perfil):
+    """Suma al perfil de la petición actual el de consultas hechas en otro hilo"""
+    if not has_request_context():
+        return
+    actual = g.get('_perfil_db')
+    if actual is None:
+        actual = g._perfil_db = {'consultas': 0, 'tiempo': 0.0, 'formas': {}}
+    actual['consultas'] += perfil['consultas']
+    actual['tiempo'] += perfil['tiempo']
+    for forma, (veces, duracion) in perfil['formas'].items():
+        entrada = actual['formas'].setdefault(forma, [0, 0.0])
+        entrada[0] += veces
+        entrada[1] += duracion
+
+
+def _finalizar_perfil(respuesta):
+    """Cierra el perfil de la petición y lo acumula por endpoint"""
+    perfil = g.pop('_perfil_db', None)
+    if perfil is None:
+        return respuesta
+
+    endpoint = request.endpoint or request.path
+    tiempo_ms = perfil['tiempo'] * 1000
+    respuesta.headers['Server-Timing'] = (
+        f"db;dur={tiempo_ms:.1f};desc=\"{perfil['consultas']} consultas\""
+    )
+
+    repetidas = [
+        (forma, veces) for forma, (veces, _) in perfil['formas'].items()
+        if veces >= Configuracion.PERFIL_UMBRAL_N_MAS_1
+    ]
+    for forma, veces in repetidas:
+        logger.warning("Posible N+1 en %s: %d ejecuciones de %s", endpoint, veces, forma)
+
+    with _lock:
+        stats = _por_endpoint.get(endpoint)
+        if stats is None:
+            stats = _por_endpoint[endpoint] = {
+                'endpoint': endpoint,
+                'peticiones': 0,
+                'consultas': 0,
+                'tiempo_ms': 0.0,
+                'tiempo_max_ms': 0.0,
+                'n_mas_1': {},
+                'lentas': {},
+            }
+        stats['peticiones'] += 1
+        stats['consultas'] += perfil['consultas']
+        stats['tiempo_ms'] += tiempo_ms
+        stats['tiempo_max_ms'] = max(stats['tiempo_max_ms'], tiempo_ms)
+        for forma, veces in repetidas:
+            stats['n_mas_1'][forma] = max(stats['n_mas_1'].get(forma, 0), veces)
+        for forma, (_, duracion) in perfil['formas'].items():
+            if duracion * 1000 > stats['lentas'].get(forma, 0.0):
+                stats['lentas'][forma] = duracion * 1000
+        # Conservar solo las sentencias más costosas de cada endpoint
+        if len(stats['lentas']) > Configuracion.PERFIL_MAX_LENTAS:
+            stats['lentas'] = dict(sorted(
+                stats['lentas'].items(), key=lambda x: x[1], reverse=True
+            )[:Configuracion.PERFIL_MAX_LENTAS])
+    return respuesta
+
+
+def registrar_perfilador(app):
+    """Activa el perfilado de consultas por petición en la aplicación"""
+    app.after_request(_finalizar_perfil)
+
+
+def resumen_endpoints(limite=20):
+    """Endpoints ordenados por tiempo total en base de datos"""
+    with _lock:
+        copia = [
+            {
+                **stats,
+                'n_mas_1': sorted(stats['n_mas_1'].items(), key=lambda x: x[1], reverse=True),
+                'lentas': sorted(stats['lentas'].items(), key=lambda x: x[1], reverse=True),
+            }
+            for stats in _por_endpoint.values()
+        ]
+    for stats in copia:
+        stats['consultas_promedio'] = stats['consultas'] / stats['peticiones']
+        stats['tiempo_promedio_ms'] = stats['tiempo_ms'] / stats['peticiones']
+    copia.sort(key=lambda s: s['tiempo_ms'], reverse=True)
+    return copia[:limite]
+
+
+def reiniciar_estadisticas():
+    """Borra las estadísticas acumuladas"""
+    with _lock:
+        _por_endpoint.clear()
+
+
+class Cronometro:
+    """Mide la duración de una consulta y la registra al salir"""
+
+    def __init__(self, consulta):
+        self.consulta = consulta
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        registrar_consulta(self.consulta, time.perf_counter() - self.inicio)
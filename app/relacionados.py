@@ -0,0 +1,92 @@
+import random
+import threading
+import time
+from db import ejecutar_consulta
+from consultas import version_catalogo
+from config import Configuracion
+
+_COLUMNAS = "id, nombre, precio, stock, imagen, categoria_id, activo, fecha_creacion"
+
+_lock = threading.Lock()
+# categoria_id -> (candidatos, versión del catálogo, momento de carga)
+_candidatos = {}
+
+
+def _cargar_categoria(categoria_id):
+    """Lee los candidatos de una categoría: sus productos activos más recientes"""
+    return ejecutar_consulta(
+        f"""SELECT {_COLUMNAS} FROM productos
+            WHERE categoria_id = %s AND activo = 1
+            ORDER BY fecha_creacion DESC, id DESC LIMIT %s""",
+        (categoria_id, Configuracion.RELACIONADOS_CANDIDATOS),
+        obtener_todos=True,
+        preparada=True
+    )
+
+
+def _guardar_categoria(categoria_id, version):
+    """Relee una categoría y la guarda con la versión leída antes de la consulta"""
+    candidatos = _cargar_categoria(categoria_id)
+    if candidatos is not None:
+        with _lock:
+            _candidatos[categoria_id] = (candidatos, version, time.monotonic())
+    return candidatos
+
+
+def _candidatos_categoria(categoria_id):
+    version = version_catalogo()
+    with _lock:
+        entrada = _candidatos.get(categoria_id)
+    if (entrada is not None and entrada[1] == version
+            and time.monotonic() - entrada[2] < Configuracion.RELACIONADOS_TTL):
+        return entrada[0]
+
+    candidatos = _guardar_categoria(categoria_id, version)
+    if candidatos is None:
+        return entrada[0] if entrada else []
+    return candidatos
+
+
+def obtener_relacionados(producto, cantidad=4):
+    """
+    Productos relacionados con `producto`, elegidos al azar de su categoría.
+
+    Cada categoría guarda en memoria una lista acotada de candidatos
+    (RELACIONADOS_CANDIDATOS), así que el costo por vista es constante
+    aunque la categoría crezca. Cada lista se guarda con la versión del
+    catálogo: cuando invalidar_catalogo() la incrementa, todos los workers
+    recargan la categoría en su siguiente uso. RELACIONADOS_TTL solo acota
+    la edad de una lista si la versión no cambia.
+    """
+    if not producto.get('categoria_id'):
+        return []
+    candidatos = [
+        candidato for candidato in _candidatos_categoria(producto['categoria_id'])
+        if candidato['id'] != producto['id']
+    ]
+    return random.sample(candidatos, min(cantidad, len(candidatos)))
+
+
+def actualizar_producto(producto_id):
+    """
+    Recarga en este proceso las categorías afectadas tras crear, editar o
+    desactivar un producto (la anterior y la actual), para que la
+    siguiente vista no espere a la consulta. Debe llamarse después de
+    invalidar_catalogo(); el resto de workers recargan por la versión.
+    """
+    producto = ejecutar_consulta(
+        "SELECT categoria_id FROM productos WHERE id = %s",
+        (producto_id,),
+        obtener_uno=True
+    )
+    with _lock:
+        categorias = {
+            categoria_id for categoria_id, (candidatos, _, _) in _candidatos.items()
+            if any(candidato['id'] == producto_id for candidato in candidatos)
+        }
+    if producto and producto['categoria_id'] in _candidatos:
+        categorias.add(producto['categoria_id'])
+
+    version = version_catalogo()
+    for categoria_id in categorias:
+        _guardar_categoria(categoria_id, version)
@@ -0,0 +1,64 @@
+import gzip
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from flask import current_app, request
+from config import Configuracion
+
+try:
+    import orjson
+except ImportError:  # opcional: serialización JSON más rápida
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # opcional: Content-Encoding br
+    brotli = None
+
+
+def _por_defecto(valor):
+    # DECIMAL como texto (igual que jsonify) y fechas en ISO 8601
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    raise TypeError(f"No serializable: {type(valor).__name__}")
+
+
+def serializar_json(datos):
+    """JSON compacto en bytes; usa orjson si está instalado"""
+    if orjson is not None:
+        return orjson.dumps(datos, default=_por_defecto)
+    return json.dumps(datos, default=_por_defecto, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def elegir_codificacion():
+    """'br', 'gzip' o None según Accept-Encoding y lo disponible"""
+    aceptadas = request.accept_encodings
+    if brotli is not None and aceptadas['br']:
+        return 'br'
+    if aceptadas['gzip']:
+        return 'gzip'
+    return None
+
+
+def comprimir(cuerpo, codificacion):
+    if codificacion == 'br':
+        return brotli.compress(cuerpo, quality=Configuracion.API_BROTLI_CALIDAD)
+    return gzip.compress(cuerpo, compresslevel=Configuracion.API_GZIP_NIVEL)
+
+
+def respuesta_json(datos, estado=200):
+    """
+    Respuesta JSON comprimida con gzip o brotli si el cliente lo acepta y
+    el cuerpo supera API_COMPRIMIR_MIN bytes (por debajo no compensa).
+    """
+    cuerpo = serializar_json(datos)
+    respuesta = current_app.response_class(cuerpo, status=estado, mimetype='application/json')
+    respuesta.vary.add('Accept-Encoding')
+    if len(cuerpo) >= Configuracion.API_COMPRIMIR_MIN:
+        codificacion = elegir_codificacion()
+        if codificacion:
+            respuesta.set_data(comprimir(cuerpo, codificacion))
+            respuesta.headers['Content-Encoding'] = codificacion
+    return respuesta
@@ -0,0 +1,80 @@
+from db import ejecutar_consulta, transaccion
+
+# Solo los pedidos en este estado cuentan como venta en el panel
+ESTADO_VENTA = 'pagado'
+
+
+def _aplicar_pedido(pedido, signo):
+    """Suma (signo=1) o resta (signo=-1) un pedido de las tablas de resumen"""
+    ejecutar_consulta(
+        """UPDATE resumen_ventas
+           SET total_ventas = total_ventas + %s, total_pedidos = total_pedidos + %s
+           WHERE id = 1""",
+        (signo * pedido['total'], signo)
+    )
+    ejecutar_consulta(
+        """INSERT INTO resumen_ventas_mensuales (mes, total_ventas, total_pedidos)
+           VALUES (%s, %s, %s)
+           ON DUPLICATE KEY UPDATE total_ventas = total_ventas + VALUES(total_ventas),
+                                   total_pedidos = total_pedidos + VALUES(total_pedidos)""",
+        (pedido['fecha'].strftime('%Y-%m'), signo * pedido['total'], signo)
+    )
+    ejecutar_consulta(
+        """INSERT INTO resumen_ventas_productos (producto_id, total_vendido, total_ingresos)
+           SELECT producto_id, unidades, ingresos FROM (
+               SELECT producto_id, %s * SUM(cantidad) AS unidades, %s * SUM(subtotal) AS ingresos
+               FROM detalle_pedido WHERE pedido_id = %s GROUP BY producto_id
+           ) AS d
+           ON DUPLICATE KEY UPDATE total_vendido = total_vendido + d.unidades,
+                                   total_ingresos = total_ingresos + d.ingresos""",
+        (signo, signo, pedido['id'])
+    )
+
+
+def registrar_cambio_estado(pedido, estado_nuevo):
+    """
+    Actualiza los resúmenes cuando un pedido entra o sale del estado
+    'pagado'.
+
+    Debe llamarse dentro de la misma transaccion() que cambia el estado,
+    con `pedido` leído con FOR UPDATE (id, total, fecha y estado
+    anterior), para que el resumen y el pedido nunca diverjan.
+    """
+    antes = pedido['estado'] == ESTADO_VENTA
+    despues = estado_nuevo == ESTADO_VENTA
+    if antes != despues:
+        _aplicar_pedido(pedido, 1 if despues else -1)
+
+
+def reconstruir_resumenes():
+    """
+    Recalcula las tablas de resumen desde pedidos y detalle_pedido.
+
+    Sirve para llenarlas la primera vez y para corregirlas si se tocaron
+    pedidos por fuera de la aplicación (por ejemplo, al borrar un usuario,
+    que elimina sus pedidos en cascada).
+    """
+    with transaccion():
+        ejecutar_consulta("DELETE FROM resumen_ventas_productos")
+        ejecutar_consulta("DELETE FROM resumen_ventas_mensuales")
+        ejecutar_consulta("DELETE FROM resumen_ventas")
+        ejecutar_consulta(
+            """INSERT INTO resumen_ventas (id, total_ventas, total_pedidos)
+               SELECT 1, COALESCE(SUM(total), 0), COUNT(*) FROM pedidos WHERE estado = %s""",
+            (ESTADO_VENTA,)
+        )
+        ejecutar_consulta(
+            """INSERT INTO resumen_ventas_mensuales (mes, total_ventas, total_pedidos)
+               SELECT DATE_FORMAT(fecha, '%%Y-%%m'), SUM(total), COUNT(*)
+               FROM pedidos WHERE estado = %s
+               GROUP BY DATE_FORMAT(fecha, '%%Y-%%m')""",
+            (ESTADO_VENTA,)
+        )
+        ejecutar_consulta(
+            """INSERT INTO resumen_ventas_productos (producto_id, total_vendido, total_ingresos)
+               SELECT dp.producto_id, SUM(dp.cantidad), SUM(dp.subtotal)
+               FROM detalle_pedido dp JOIN pedidos pe ON dp.pedido_id = pe.id
+               WHERE pe.estado = %s
+               GROUP BY dp.producto_id""",
+            (ESTADO_VENTA,)
+        )
@@ -1,92 +1,101 @@
-import os
-from flask import Blueprint, request, render_template, redirect, url_for, flash, session
-from werkzeug.utils import secure_filename
-from db import ejecutar_consulta, obtener_conexion
+import csv
+import io
+from flask import (Blueprint, request, render_template, stream_template, redirect, url_for, flash,
+                   get_flashed_messages, session, Response, stream_with_context)
+from mysql.connector import Error
+from db import (ejecutar_consulta, consultar_en_paralelo, transaccion, iterar_consulta,
+                estadisticas_pool, estado_replicas)
+from perfilador import resumen_endpoints, reiniciar_estadisticas
+from consultas import obtener_categorias, invalidar_categorias, invalidar_catalogo, estadisticas_caches
+from relacionados import actualizar_producto
+from resumen_ventas import registrar_cambio_estado
+from imagenes import guardar_subida, olvidar_imagen
+from fragmentos import estadisticas_fragmentos
+from cache_http import estadisticas_paginas
 from routes.auth import admin_requerido
 from config import Configuracion
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
 
+def transmitir_plantilla(plantilla, **contexto):
+    """Renderiza una plantilla por partes a medida que se consumen sus datos"""
+    # Los mensajes flash se sacan de la sesión antes de enviar las cabeceras;
+    # durante la transmisión la cookie de sesión ya no puede actualizarse
+    get_flashed_messages(with_categories=True)
+    return stream_template(plantilla, **contexto)
+
+
 @admin_bp.route('/')
 @admin_requerido
 def panel():
     """Panel de administración con estadísticas"""
-    # Estadísticas de ventas
-    ventas_totales = ejecutar_consulta(
-        "SELECT COALESCE(SUM(total), 0) as total_ventas, COUNT(*) as total_pedidos FROM pedidos WHERE estado = 'pagado'",
-        obtener_uno=True
-    )
-
-    total_usuarios = ejecutar_consulta(
-        "SELECT COUNT(*) as total FROM usuarios WHERE rol = 'cliente'",
-        obtener_uno=True
-    )
-
-    total_productos = ejecutar_consulta(
-        "SELECT COUNT(*) as total FROM productos WHERE activo = 1",
-        obtener_uno=True
-    )
-
-    productos_bajo_stock = ejecutar_consulta(
-        "SELECT COUNT(*) as total FROM productos WHERE stock <= 5 AND activo = 1",
-        obtener_uno=True
-    )
-
-    # Pedidos recientes
-    pedidos_recientes = ejecutar_consulta(
-        """SELECT p.*, u.nombre as usuario_nombre 
-           FROM pedidos p JOIN usuarios u ON p.usuario_id = u.id 
-           ORDER BY p.fecha DESC LIMIT 10""",
-        obtener_todos=True
-    ) or []
-
-    # Productos más vendidos
-    productos_top = ejecutar_consulta(
-        """SELECT pr.nombre, SUM(dp.cantidad) as total_vendido, SUM(dp.subtotal) as total_ingresos
-           FROM detalle_pedido dp 
-           JOIN productos pr ON dp.producto_id = pr.id
-           JOIN pedidos pe ON dp.pedido_id = pe.id
-           WHERE pe.estado = 'pagado'
-           GROUP BY pr.id, pr.nombre
-           ORDER BY total_vendido DESC LIMIT 5""",
-        obtener_todos=True
-    ) or []
-
-    # Ventas por mes (últimos 6 meses)
-    ventas_mensuales = ejecutar_consulta(
-        """SELECT DATE_FORMAT(fecha, '%%Y-%%m') as mes, 
-           COALESCE(SUM(total), 0) as total_ventas, 
-           COUNT(*) as total_pedidos
-           FROM pedidos WHERE estado = 'pagado'
-           GROUP BY DATE_FORMAT(fecha, '%%Y-%%m')
-           ORDER BY mes DESC LIMIT 6""",
-        obtener_todos=True
-    ) or []
+    # Consultas independientes: se lanzan a la vez y se espera a la más lenta
+    resultados = consultar_en_paralelo({
+        # Estadísticas de ventas (tablas de resumen, ver resumen_ventas.py)
+        'ventas_totales': lambda: ejecutar_consulta(
+            "SELECT total_ventas, total_pedidos FROM resumen_ventas WHERE id = 1",
+            obtener_uno=True
+        ),
+        'total_usuarios': lambda: ejecutar_consulta(
+            "SELECT COUNT(*) as total FROM usuarios WHERE rol = 'cliente'",
+            obtener_uno=True
+        ),
+        'total_productos': lambda: ejecutar_consulta(
+            "SELECT COUNT(*) as total FROM productos WHERE activo = 1",
+            obtener_uno=True
+        ),
+        'productos_bajo_stock': lambda: ejecutar_consulta(
+            "SELECT COUNT(*) as total FROM productos WHERE stock <= 5 AND activo = 1",
+            obtener_uno=True
+        ),
+        # Pedidos recientes
+        'pedidos_recientes': lambda: ejecutar_consulta(
+            """SELECT p.*, u.nombre as usuario_nombre 
+               FROM pedidos p JOIN usuarios u ON p.usuario_id = u.id 
+               ORDER BY p.fecha DESC LIMIT 10""",
+            obtener_todos=True
+        ),
+        # Productos más vendidos
+        'productos_top': lambda: ejecutar_consulta(
+            """SELECT pr.nombre, r.total_vendido, r.total_ingresos
+               FROM resumen_ventas_productos r
+               JOIN productos pr ON r.producto_id = pr.id
+               WHERE r.total_vendido > 0
+               ORDER BY r.total_vendido DESC LIMIT 5""",
+            obtener_todos=True
+        ),
+        # Ventas por mes (últimos 6 meses)
+        'ventas_mensuales': lambda: ejecutar_consulta(
+            """SELECT mes, total_ventas, total_pedidos
+               FROM resumen_ventas_mensuales WHERE total_pedidos > 0
+               ORDER BY mes DESC LIMIT 6""",
+            obtener_todos=True
+        ),
+    })
 
     return render_template('admin/panel.html',
-                           ventas_totales=ventas_totales,
-                           total_usuarios=total_usuarios,
-                           total_productos=total_productos,
-                           productos_bajo_stock=productos_bajo_stock,
-                           pedidos_recientes=pedidos_recientes,
-                           productos_top=productos_top,
-                           ventas_mensuales=ventas_mensuales)
+                           ventas_totales=resultados['ventas_totales'] or {'total_ventas': 0, 'total_pedidos': 0},
+                           total_usuarios=resultados['total_usuarios'],
+                           total_productos=resultados['total_productos'],
+                           productos_bajo_stock=resultados['productos_bajo_stock'],
+                           pedidos_recientes=resultados['pedidos_recientes'] or [],
+                           productos_top=resultados['productos_top'] or [],
+                           ventas_mensuales=resultados['ventas_mensuales'] or [])
 
 
 @admin_bp.route('/productos')
 @admin_requerido
 def listar_productos():
-    """Lista todos los productos para administración"""
-    productos = ejecutar_consulta(
+    """Lista todos los productos para administración (transmitida por lotes)"""
+    productos = iterar_consulta(
         """SELECT p.*, c.nombre as categoria_nombre 
            FROM productos p 
            LEFT JOIN categorias c ON p.categoria_id = c.id 
-           ORDER BY p.fecha_creacion DESC""",
-        obtener_todos=True
-    ) or []
+           ORDER BY p.fecha_creacion DESC"""
+    )
 
-    return render_template('admin/productos.html', productos=productos)
+    return transmitir_plantilla('admin/productos.html', productos=productos)
 
 
 def archivo_permitido(nombre_archivo):
@@ -99,7 +108,7 @@ def archivo_permitido(nombre_archivo):
 @admin_requerido
 def crear_producto():
     """Crear un nuevo producto"""
-    categorias = ejecutar_consulta("SELECT * FROM categorias ORDER BY nombre", obtener_todos=True) or []
+    categorias = obtener_categorias()
 
     if request.method == 'POST':
         nombre = request.form.get('nombre', '').strip()
@@ -118,14 +127,11 @@ def crear_producto():
             flash('El precio debe ser mayor a 0.', 'error')
             return render_template('admin/producto_form.html', categorias=categorias, accion='Crear')
 
-        # Procesar imagen
+        # Procesar imagen (las variantes se generan en segundo plano)
         if 'imagen' in request.files:
             archivo = request.files['imagen']
             if archivo.filename and archivo_permitido(archivo.filename):
-                imagen_nombre = secure_filename(archivo.filename)
-                ruta_guardado = os.path.join(Configuracion.CARPETA_UPLOADS, imagen_nombre)
-                os.makedirs(Configuracion.CARPETA_UPLOADS, exist_ok=True)
-                archivo.save(ruta_guardado)
+                imagen_nombre = guardar_subida(archivo)
 
         producto_id = ejecutar_consulta(
             """INSERT INTO productos (nombre, descripcion, precio, stock, imagen, categoria_id)
@@ -135,6 +141,8 @@ def crear_producto():
         )
 
         if producto_id:
+            invalidar_catalogo()
+            actualizar_producto(producto_id)
             flash('Producto creado exitosamente.', 'exito')
             return redirect(url_for('admin.listar_productos'))
         else:
@@ -155,7 +163,7 @@ def editar_producto(producto_id):
         flash('Producto no encontrado.', 'error')
         return redirect(url_for('admin.listar_productos'))
 
-    categorias = ejecutar_consulta("SELECT * FROM categorias ORDER BY nombre", obtener_todos=True) or []
+    categorias = obtener_categorias()
 
     if request.method == 'POST':
         nombre = request.form.get('nombre', '').strip()
@@ -174,18 +182,20 @@ def editar_producto(producto_id):
         if 'imagen' in request.files:
             archivo = request.files['imagen']
             if archivo.filename and archivo_permitido(archivo.filename):
-                imagen_nombre = secure_filename(archivo.filename)
-                ruta_guardado = os.path.join(Configuracion.CARPETA_UPLOADS, imagen_nombre)
-                os.makedirs(Configuracion.CARPETA_UPLOADS, exist_ok=True)
-                archivo.save(ruta_guardado)
+                imagen_nombre = guardar_subida(archivo)
 
         filas = ejecutar_consulta(
             """UPDATE productos SET nombre = %s, descripcion = %s, precio = %s, 
-               stock = %s, imagen = %s, categoria_id = %s, activo = %s WHERE id = %s""",
+               stock = %s, imagen = %s, categoria_id = %s, activo = %s,
+               version = version + 1 WHERE id = %s""",
             (nombre, descripcion, precio, stock, imagen_nombre, categoria_id, activo, producto_id)
         )
 
         if filas is not None:
+            if imagen_nombre != producto['imagen']:
+                olvidar_imagen(producto['imagen'])
+            invalidar_catalogo()
+            actualizar_producto(producto_id)
             flash('Producto actualizado exitosamente.', 'exito')
             return redirect(url_for('admin.listar_productos'))
         else:
@@ -199,6 +209,8 @@ def editar_producto(producto_id):
 def eliminar_producto(producto_id):
     """Eliminar un producto (desactivar)"""
     ejecutar_consulta("UPDATE productos SET activo = 0 WHERE id = %s", (producto_id,))
+    invalidar_catalogo()
+    actualizar_producto(producto_id)
     flash('Producto eliminado exitosamente.', 'exito')
     return redirect(url_for('admin.listar_productos'))
 
@@ -206,15 +218,48 @@ def eliminar_producto(producto_id):
 @admin_bp.route('/pedidos')
 @admin_requerido
 def listar_pedidos():
-    """Lista todos los pedidos"""
-    pedidos = ejecutar_consulta(
+    """Lista todos los pedidos (transmitida por lotes)"""
+    pedidos = iterar_consulta(
         """SELECT p.*, u.nombre as usuario_nombre, u.email as usuario_email
            FROM pedidos p JOIN usuarios u ON p.usuario_id = u.id
-           ORDER BY p.fecha DESC""",
-        obtener_todos=True
-    ) or []
+           ORDER BY p.fecha DESC"""
+    )
+
+    return transmitir_plantilla('admin/pedidos.html', pedidos=pedidos)
+
+
+@admin_bp.route('/pedidos/exportar.csv')
+@admin_requerido
+def exportar_pedidos():
+    """Exporta todos los pedidos a CSV sin cargarlos completos en memoria"""
+    columnas = ['numero_orden', 'fecha', 'usuario_nombre', 'usuario_email', 'estado', 'total',
+                'direccion_envio', 'telefono']
+    pedidos = iterar_consulta(
+        """SELECT p.numero_orden, p.fecha, u.nombre as usuario_nombre, u.email as usuario_email,
+                  p.estado, p.total, p.direccion_envio, p.telefono
+           FROM pedidos p JOIN usuarios u ON p.usuario_id = u.id
+           ORDER BY p.fecha DESC"""
+    )
 
-    return render_template('admin/pedidos.html', pedidos=pedidos)
+    def generar():
+        buffer = io.StringIO()
+        escritor = csv.DictWriter(buffer, fieldnames=columnas)
+        # BOM para que Excel detecte UTF-8
+        buffer.write('\ufeff')
+        escritor.writeheader()
+        for i, pedido in enumerate(pedidos, 1):
+            escritor.writerow(pedido)
+            if i % 500 == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    return Response(
+        stream_with_context(generar()),
+        mimetype='text/csv',
+        headers={'Content-Disposition': 'attachment; filename=pedidos.csv'}
+    )
 
 
 @admin_bp.route('/pedidos/actualizar/<int:pedido_id>', methods=['POST'])
@@ -228,10 +273,23 @@ def actualizar_pedido(pedido_id):
         flash('Estado no válido.', 'error')
         return redirect(url_for('admin.listar_pedidos'))
 
-    ejecutar_consulta(
-        "UPDATE pedidos SET estado = %s WHERE id = %s",
-        (nuevo_estado, pedido_id)
-    )
+    try:
+        with transaccion():
+            pedido = ejecutar_consulta(
+                "SELECT id, total, fecha, estado FROM pedidos WHERE id = %s FOR UPDATE",
+                (pedido_id,),
+                obtener_uno=True
+            )
+            if pedido:
+                ejecutar_consulta(
+                    "UPDATE pedidos SET estado = %s WHERE id = %s",
+                    (nuevo_estado, pedido_id)
+                )
+                registrar_cambio_estado(pedido, nuevo_estado)
+    except Error as e:
+        print(f"Error al actualizar pedido: {e}")
+        flash('Error al actualizar el estado del pedido.', 'error')
+        return redirect(url_for('admin.listar_pedidos'))
 
     flash(f'Estado del pedido actualizado a "{nuevo_estado}".', 'exito')
     return redirect(url_for('admin.listar_pedidos'))
@@ -285,6 +343,7 @@ def crear_categoria():
         )
 
         if categoria_id:
+            invalidar_categorias()
             flash('Categoría creada exitosamente.', 'exito')
             return redirect(url_for('admin.listar_categorias'))
         else:
@@ -329,6 +388,7 @@ def editar_categoria(categoria_id):
         )
 
         if filas is not None:
+            invalidar_categorias()
             flash('Categoría actualizada exitosamente.', 'exito')
             return redirect(url_for('admin.listar_categorias'))
         else:
@@ -351,5 +411,32 @@ def eliminar_categoria(categoria_id):
         return redirect(url_for('admin.listar_categorias'))
 
     ejecutar_consulta("DELETE FROM categorias WHERE id = %s", (categoria_id,))
+    invalidar_categorias()
     flash('Categoría eliminada exitosamente.', 'exito')
     return redirect(url_for('admin.listar_categorias'))
+
+
+# ============================================
+# Rendimiento de la base de datos
+# ============================================
+
+@admin_bp.route('/rendimiento')
+@admin_requerido
+def rendimiento():
+    """Endpoints con más tiempo en base de datos (estadísticas de este worker)"""
+    return render_template('admin/rendimiento.html',
+                           endpoints=resumen_endpoints(),
+                           pool=estadisticas_pool(),
+                           replicas=estado_replicas(),
+                           caches={**estadisticas_caches(), 'fragmentos': estadisticas_fragmentos(),
+                                   'paginas': estadisticas_paginas()},
+                           umbral_lenta=Configuracion.PERFIL_UMBRAL_LENTA_MS)
+
+
+@admin_bp.route('/rendimiento/reiniciar', methods=['POST'])
+@admin_requerido
+def reiniciar_rendimiento():
+    """Reinicia las estadísticas de consultas"""
+    reiniciar_estadisticas()
+    flash('Estadísticas de rendimiento reiniciadas.', 'exito')
+    return redirect(url_for('admin.rendimiento'))
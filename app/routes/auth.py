@@ -1,7 +1,8 @@
 from flask import Blueprint, request, redirect, url_for, flash, session, render_template
 from functools import wraps
-import bcrypt
 from db import ejecutar_consulta
+from seguridad import generar_hash, verificar_password, rehashear_si_hace_falta
+from carritos import vaciar_carrito
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -65,13 +66,13 @@ def registro():
                 flash(error, 'error')
             return render_template('registro.html', nombre=nombre, email=email)
 
-        # Encriptar contraseña con bcrypt
-        password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        # Encriptar contraseña con bcrypt (en el pool de seguridad.py)
+        password_hash = generar_hash(password)
 
         # Insertar usuario
         usuario_id = ejecutar_consulta(
             "INSERT INTO usuarios (nombre, email, password, rol) VALUES (%s, %s, %s, 'cliente')",
-            (nombre, email, password_hash.decode('utf-8')),
+            (nombre, email, password_hash),
             obtener_id=True
         )
 
@@ -99,10 +100,13 @@ def login():
         usuario = ejecutar_consulta(
             "SELECT id, nombre, email, password, rol FROM usuarios WHERE email = %s",
             (email,),
-            obtener_uno=True
+            obtener_uno=True,
+            preparada=True
         )
 
-        if usuario and bcrypt.checkpw(password.encode('utf-8'), usuario['password'].encode('utf-8')):
+        if usuario and verificar_password(password, usuario['password']):
+            rehashear_si_hace_falta(usuario['id'], password, usuario['password'])
+
             # Crear sesión
             session['usuario_id'] = usuario['id']
             session['usuario_nombre'] = usuario['nombre']
@@ -125,6 +129,7 @@ def login():
 @auth_bp.route('/logout')
 def logout():
     """Cerrar sesión"""
+    vaciar_carrito()
     session.clear()
     flash('Has cerrado sesión correctamente.', 'info')
     return redirect(url_for('principal.inicio'))
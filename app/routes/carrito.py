@@ -1,26 +1,32 @@
-from flask import Blueprint, request, session, jsonify, render_template, redirect, url_for, flash
-from db import ejecutar_consulta
+from flask import Blueprint, request, jsonify, render_template, redirect, url_for, flash
+from carritos import carrito_actual, total_articulos
+from config import Configuracion
 from routes.auth import login_requerido
 
 carrito_bp = Blueprint('carrito', __name__)
 
 
+def _id_producto(datos):
+    """producto_id del cuerpo JSON como entero, o None si no es válido"""
+    try:
+        return int(datos.get('producto_id'))
+    except (TypeError, ValueError):
+        return None
+
+
 @carrito_bp.route('/api/carrito/agregar', methods=['POST'])
 def agregar_al_carrito():
     """Agrega un producto al carrito via AJAX"""
     datos = request.get_json()
-    producto_id = datos.get('producto_id')
+    producto_id = _id_producto(datos)
     cantidad = datos.get('cantidad', 1)
 
     if not producto_id:
         return jsonify({'exito': False, 'mensaje': 'Producto no especificado'}), 400
 
     # Verificar que el producto existe y tiene stock
-    producto = ejecutar_consulta(
-        "SELECT id, nombre, precio, stock, imagen FROM productos WHERE id = %s AND activo = 1",
-        (producto_id,),
-        obtener_uno=True
-    )
+    carrito = carrito_actual()
+    producto = carrito.cargar_productos([producto_id]).get(producto_id)
 
     if not producto:
         return jsonify({'exito': False, 'mensaje': 'Producto no encontrado'}), 404
@@ -28,37 +34,17 @@ def agregar_al_carrito():
     if producto['stock'] < cantidad:
         return jsonify({'exito': False, 'mensaje': f'Stock insuficiente. Solo quedan {producto["stock"]} unidades.'}), 400
 
-    # Inicializar carrito en sesión si no existe
-    if 'carrito' not in session:
-        session['carrito'] = {}
-
-    carrito = session['carrito']
-    str_id = str(producto_id)
-
-    if str_id in carrito:
-        nueva_cantidad = carrito[str_id]['cantidad'] + cantidad
-        if nueva_cantidad > producto['stock']:
-            return jsonify({'exito': False, 'mensaje': f'No puedes agregar más. Stock disponible: {producto["stock"]}'}), 400
-        carrito[str_id]['cantidad'] = nueva_cantidad
-    else:
-        carrito[str_id] = {
-            'producto_id': producto['id'],
-            'nombre': producto['nombre'],
-            'precio': float(producto['precio']),
-            'imagen': producto['imagen'],
-            'cantidad': cantidad
-        }
-
-    session['carrito'] = carrito
-    session.modified = True
-
-    # Calcular total de artículos en el carrito
-    total_articulos = sum(item['cantidad'] for item in carrito.values())
+    nueva_cantidad = carrito.cantidades.get(producto_id, 0) + cantidad
+    if nueva_cantidad > producto['stock']:
+        return jsonify({'exito': False, 'mensaje': f'No puedes agregar más. Stock disponible: {producto["stock"]}'}), 400
+
+    carrito.fijar(producto_id, nueva_cantidad)
+    carrito.guardar()
 
     return jsonify({
         'exito': True,
         'mensaje': f'"{producto["nombre"]}" agregado al carrito',
-        'total_articulos': total_articulos
+        'total_articulos': carrito.articulos
     })
 
 
@@ -66,43 +52,34 @@ def agregar_al_carrito():
 def actualizar_carrito():
     """Actualiza la cantidad de un producto en el carrito via AJAX"""
     datos = request.get_json()
-    producto_id = str(datos.get('producto_id'))
+    producto_id = _id_producto(datos)
     cantidad = datos.get('cantidad', 1)
 
-    if 'carrito' not in session or producto_id not in session['carrito']:
+    carrito = carrito_actual()
+    if producto_id not in carrito.cantidades:
         return jsonify({'exito': False, 'mensaje': 'Producto no encontrado en el carrito'}), 404
 
     if cantidad <= 0:
-        del session['carrito'][producto_id]
-        session.modified = True
-        carrito = session.get('carrito', {})
-        total = sum(item['precio'] * item['cantidad'] for item in carrito.values())
-        total_articulos = sum(item['cantidad'] for item in carrito.values())
-        return jsonify({'exito': True, 'mensaje': 'Producto eliminado del carrito', 'total': total, 'total_articulos': total_articulos})
-
-    # Verificar stock
-    producto = ejecutar_consulta(
-        "SELECT stock FROM productos WHERE id = %s",
-        (int(producto_id),),
-        obtener_uno=True
-    )
+        carrito.fijar(producto_id, 0)
+        carrito.guardar()
+        return jsonify({'exito': True, 'mensaje': 'Producto eliminado del carrito', 'total': carrito.total,
+                        'total_articulos': carrito.articulos})
+
+    # Verificar stock (la misma consulta trae los precios para el total)
+    carrito.cargar_productos()
+    producto = carrito.productos.get(producto_id)
 
     if producto and cantidad > producto['stock']:
         return jsonify({'exito': False, 'mensaje': f'Stock insuficiente. Disponible: {producto["stock"]}'}), 400
 
-    session['carrito'][producto_id]['cantidad'] = cantidad
-    session.modified = True
-
-    carrito = session['carrito']
-    subtotal = carrito[producto_id]['precio'] * cantidad
-    total = sum(item['precio'] * item['cantidad'] for item in carrito.values())
-    total_articulos = sum(item['cantidad'] for item in carrito.values())
+    carrito.fijar(producto_id, cantidad)
+    carrito.guardar()
 
     return jsonify({
         'exito': True,
-        'subtotal': subtotal,
-        'total': total,
-        'total_articulos': total_articulos
+        'subtotal': carrito.subtotal(producto_id),
+        'total': carrito.total,
+        'total_articulos': carrito.articulos
     })
 
 
@@ -110,44 +87,108 @@ def actualizar_carrito():
 def eliminar_del_carrito():
     """Elimina un producto del carrito via AJAX"""
     datos = request.get_json()
-    producto_id = str(datos.get('producto_id'))
+    producto_id = _id_producto(datos)
 
-    if 'carrito' not in session or producto_id not in session['carrito']:
+    carrito = carrito_actual()
+    if producto_id not in carrito.cantidades:
         return jsonify({'exito': False, 'mensaje': 'Producto no encontrado en el carrito'}), 404
 
-    del session['carrito'][producto_id]
-    session.modified = True
-
-    carrito = session.get('carrito', {})
-    total = sum(item['precio'] * item['cantidad'] for item in carrito.values())
-    total_articulos = sum(item['cantidad'] for item in carrito.values())
+    carrito.fijar(producto_id, 0)
+    carrito.guardar()
 
     return jsonify({
         'exito': True,
         'mensaje': 'Producto eliminado del carrito',
-        'total': total,
-        'total_articulos': total_articulos
+        'total': carrito.total,
+        'total_articulos': carrito.articulos
+    })
+
+
+@carrito_bp.route('/api/carrito/lote', methods=['POST'])
+def lote_carrito():
+    """
+    Aplica varias operaciones sobre el carrito en una sola petición.
+
+    Cuerpo: {"operaciones": [{"accion": "agregar" | "actualizar" | "eliminar",
+                              "producto_id": 1, "cantidad": 2}, ...]}
+
+    Los productos de todas las operaciones se leen con una sola consulta y
+    los cambios se guardan de una vez. Cada operación se valida por
+    separado: las que fallan (producto inexistente, stock insuficiente) no
+    impiden aplicar las demás y se informan en `resultados`.
+    """
+    datos = request.get_json(silent=True) or {}
+    operaciones = datos.get('operaciones')
+    if not isinstance(operaciones, list) or not operaciones:
+        return jsonify({'exito': False, 'mensaje': 'No se indicaron operaciones'}), 400
+    if len(operaciones) > Configuracion.CARRITO_MAX_OPERACIONES:
+        return jsonify({'exito': False, 'mensaje': f'Máximo {Configuracion.CARRITO_MAX_OPERACIONES} operaciones por lote'}), 400
+
+    carrito = carrito_actual()
+    ids = {_id_producto(operacion) for operacion in operaciones if isinstance(operacion, dict)}
+    ids.discard(None)
+    carrito.cargar_productos(set(carrito.cantidades) | ids)
+
+    resultados = []
+    for operacion in operaciones:
+        if not isinstance(operacion, dict):
+            resultados.append({'exito': False, 'mensaje': 'Operación no válida'})
+            continue
+        accion = operacion.get('accion')
+        producto_id = _id_producto(operacion)
+        cantidad = operacion.get('cantidad', 1)
+        producto = carrito.productos.get(producto_id)
+        actual = carrito.cantidades.get(producto_id, 0)
+
+        if accion in ('agregar', 'actualizar') and (not isinstance(cantidad, int) or isinstance(cantidad, bool)):
+            resultados.append({'exito': False, 'producto_id': producto_id, 'mensaje': 'Cantidad no válida'})
+            continue
+        if accion == 'agregar':
+            nueva_cantidad = actual + cantidad
+        elif accion == 'actualizar':
+            nueva_cantidad = cantidad
+        elif accion == 'eliminar':
+            nueva_cantidad = 0
+        else:
+            resultados.append({'exito': False, 'producto_id': producto_id, 'mensaje': 'Acción no válida'})
+            continue
+
+        if nueva_cantidad <= 0 and actual:
+            carrito.fijar(producto_id, 0)
+            resultados.append({'exito': True, 'producto_id': producto_id, 'cantidad': 0})
+        elif nueva_cantidad <= 0 or not producto:
+            resultados.append({'exito': False, 'producto_id': producto_id,
+                               'mensaje': 'Producto no encontrado' if not producto else 'Cantidad no válida'})
+        elif nueva_cantidad > producto['stock']:
+            resultados.append({'exito': False, 'producto_id': producto_id, 'cantidad': actual,
+                               'mensaje': f'Stock insuficiente para "{producto["nombre"]}". Disponible: {producto["stock"]}'})
+        else:
+            carrito.fijar(producto_id, nueva_cantidad)
+            resultados.append({'exito': True, 'producto_id': producto_id, 'cantidad': nueva_cantidad,
+                               'subtotal': carrito.subtotal(producto_id)})
+    carrito.guardar()
+
+    return jsonify({
+        'exito': all(resultado['exito'] for resultado in resultados),
+        'resultados': resultados,
+        'total': carrito.total,
+        'total_articulos': carrito.articulos
     })
 
 
 @carrito_bp.route('/carrito')
 def ver_carrito():
     """Página del carrito de compras"""
-    carrito = session.get('carrito', {})
+    carrito = carrito_actual()
     items = []
-    total = 0
 
-    for str_id, item in carrito.items():
-        subtotal = item['precio'] * item['cantidad']
-        items.append({**item, 'subtotal': subtotal})
-        total += subtotal
+    for str_id, item in carrito.items().items():
+        items.append({**item, 'subtotal': carrito.subtotal(item['producto_id'])})
 
-    return render_template('carrito.html', items=items, total=total)
+    return render_template('carrito.html', items=items, total=carrito.total)
 
 
 @carrito_bp.route('/api/carrito/cantidad')
 def cantidad_carrito():
     """Devuelve la cantidad total de artículos en el carrito (para el badge)"""
-    carrito = session.get('carrito', {})
-    total_articulos = sum(item['cantidad'] for item in carrito.values())
-    return jsonify({'total_articulos': total_articulos})
+    return jsonify({'total_articulos': total_articulos()})
@@ -1,7 +1,10 @@
 import uuid
 from datetime import datetime
 from flask import Blueprint, request, session, render_template, redirect, url_for, flash
-from db import ejecutar_consulta, obtener_conexion
+from mysql.connector import Error
+from db import ejecutar_consulta, transaccion
+from resumen_ventas import registrar_cambio_estado
+from carritos import carrito_actual, vaciar_carrito
 from routes.auth import login_requerido
 
 pedidos_bp = Blueprint('pedidos', __name__)
@@ -14,11 +17,111 @@ def generar_numero_orden():
     return f'ORD-{fecha}-{codigo}'
 
 
+class StockInsuficienteError(Exception):
+    """Un producto del carrito o del pedido no tiene stock suficiente"""
+
+    def __init__(self, nombre=None):
+        super().__init__(f'Stock insuficiente para "{nombre}"' if nombre else 'Stock insuficiente')
+        self.nombre = nombre
+
+
+def crear_pedido(usuario_id, carrito, direccion, telefono):
+    """
+    Crea un pedido pendiente con todas sus líneas en una sola transacción.
+
+    Usa tres sentencias sin importar el tamaño del carrito: bloquea los
+    productos con un único SELECT ... FOR UPDATE (en orden de id, para
+    no interbloquearse con otros checkouts), inserta el pedido e inserta
+    todas las líneas con un INSERT de varias filas.
+
+    Returns:
+        El id del pedido creado.
+
+    Raises:
+        StockInsuficienteError: si algún producto no alcanza la cantidad.
+        mysql.connector.Error: si falla la base de datos.
+    """
+    items = list(carrito.values())
+    ids = sorted({item['producto_id'] for item in items})
+    total = sum(item['precio'] * item['cantidad'] for item in items)
+
+    with transaccion():
+        marcadores = ', '.join(['%s'] * len(ids))
+        productos = ejecutar_consulta(
+            f"SELECT id, stock FROM productos WHERE id IN ({marcadores}) ORDER BY id FOR UPDATE",
+            tuple(ids),
+            obtener_todos=True
+        )
+        stock = {producto['id']: producto['stock'] for producto in productos}
+        for item in items:
+            if stock.get(item['producto_id'], 0) < item['cantidad']:
+                raise StockInsuficienteError(item['nombre'])
+
+        pedido_id = ejecutar_consulta(
+            """INSERT INTO pedidos (usuario_id, numero_orden, total, estado, direccion_envio, telefono)
+               VALUES (%s, %s, %s, 'pendiente', %s, %s)""",
+            (usuario_id, generar_numero_orden(), total, direccion, telefono),
+            obtener_id=True
+        )
+
+        valores = ', '.join(['(%s, %s, %s, %s, %s)'] * len(items))
+        parametros = []
+        for item in items:
+            parametros.extend((pedido_id, item['producto_id'], item['cantidad'], item['precio'],
+                               item['precio'] * item['cantidad']))
+        ejecutar_consulta(
+            f"""INSERT INTO detalle_pedido (pedido_id, producto_id, cantidad, precio_unitario, subtotal)
+                VALUES {valores}""",
+            tuple(parametros)
+        )
+    return pedido_id
+
+
+def pagar_pedido(pedido, detalles):
+    """
+    Descuenta el stock de todas las líneas y marca el pedido como pagado
+    con una sola sentencia UPDATE sobre productos y pedidos.
+
+    La sentencia solo toca los productos con stock suficiente y solo si el
+    pedido sigue pendiente, así que el número de filas cambiadas debe ser
+    exactamente productos distintos + 1 (el pedido). Cualquier diferencia
+    revierte la transacción: un producto sin stock o un pago repetido no
+    dejan el pedido a medias ni venden de más.
+
+    Raises:
+        StockInsuficienteError: si alguna línea no pudo descontarse.
+        mysql.connector.Error: si el pedido ya no está pendiente o falla
+            la base de datos.
+    """
+    esperadas = len({detalle['producto_id'] for detalle in detalles}) + 1
+    with transaccion():
+        filas = ejecutar_consulta(
+            """UPDATE productos p
+               JOIN (SELECT producto_id, SUM(cantidad) AS cantidad
+                     FROM detalle_pedido WHERE pedido_id = %s
+                     GROUP BY producto_id) d ON d.producto_id = p.id
+               JOIN pedidos pe ON pe.id = %s AND pe.estado = 'pendiente'
+               SET p.stock = p.stock - d.cantidad, pe.estado = 'pagado'
+               WHERE p.stock >= d.cantidad""",
+            (pedido['id'], pedido['id'])
+        )
+        if filas == 0:
+            estado = ejecutar_consulta(
+                "SELECT estado FROM pedidos WHERE id = %s", (pedido['id'],), obtener_uno=True
+            )
+            if not estado or estado['estado'] != 'pendiente':
+                raise Error("El pedido ya fue procesado")
+        if filas != esperadas:
+            raise StockInsuficienteError()
+
+        registrar_cambio_estado(pedido, 'pagado')
+
+
 @pedidos_bp.route('/checkout', methods=['GET', 'POST'])
 @login_requerido
 def checkout():
     """Página de checkout para confirmar la compra"""
-    carrito = session.get('carrito', {})
+    carrito = carrito_actual().items()
 
     if not carrito:
         flash('Tu carrito está vacío.', 'advertencia')
@@ -38,55 +141,15 @@ def checkout():
                 total += subtotal
             return render_template('checkout.html', items=items, total=total)
 
-        # Verificar stock de todos los productos
-        for str_id, item in carrito.items():
-            producto = ejecutar_consulta(
-                "SELECT stock FROM productos WHERE id = %s",
-                (item['producto_id'],),
-                obtener_uno=True
-            )
-            if not producto or producto['stock'] < item['cantidad']:
-                flash(f'Stock insuficiente para "{item["nombre"]}".', 'error')
-                return redirect(url_for('carrito.ver_carrito'))
-
-        # Calcular total
-        total = sum(item['precio'] * item['cantidad'] for item in carrito.values())
-
-        # Generar número de orden
-        numero_orden = generar_numero_orden()
-
-        # Crear pedido
-        pedido_id = ejecutar_consulta(
-            """INSERT INTO pedidos (usuario_id, numero_orden, total, estado, direccion_envio, telefono)
-               VALUES (%s, %s, %s, 'pendiente', %s, %s)""",
-            (session['usuario_id'], numero_orden, total, direccion, telefono),
-            obtener_id=True
-        )
-
-        if not pedido_id:
-            flash('Error al crear el pedido. Inténtalo de nuevo.', 'error')
-            return redirect(url_for('carrito.ver_carrito'))
-
-        # Insertar detalles del pedido
-        conexion = obtener_conexion()
         try:
-            cursor = conexion.cursor()
-            for item in carrito.values():
-                subtotal = item['precio'] * item['cantidad']
-                cursor.execute(
-                    """INSERT INTO detalle_pedido (pedido_id, producto_id, cantidad, precio_unitario, subtotal)
-                       VALUES (%s, %s, %s, %s, %s)""",
-                    (pedido_id, item['producto_id'], item['cantidad'], item['precio'], subtotal)
-                )
-            conexion.commit()
-        except Exception as e:
-            conexion.rollback()
-            print(f"Error al insertar detalles: {e}")
-            flash('Error al procesar el pedido.', 'error')
+            pedido_id = crear_pedido(session['usuario_id'], carrito, direccion, telefono)
+        except StockInsuficienteError as e:
+            flash(f'Stock insuficiente para "{e.nombre}".', 'error')
+            return redirect(url_for('carrito.ver_carrito'))
+        except Error as e:
+            print(f"Error al crear el pedido: {e}")
+            flash('Error al crear el pedido. Inténtalo de nuevo.', 'error')
             return redirect(url_for('carrito.ver_carrito'))
-        finally:
-            cursor.close()
-            conexion.close()
 
         # Redirigir a la simulación de pago
         return redirect(url_for('pedidos.pago', pedido_id=pedido_id))
@@ -154,36 +217,18 @@ def procesar_pago():
     ) or []
 
     # Actualizar stock y estado del pedido
-    conexion = obtener_conexion()
     try:
-        cursor = conexion.cursor()
-
-        # Descontar stock
-        for detalle in detalles:
-            cursor.execute(
-                "UPDATE productos SET stock = stock - %s WHERE id = %s AND stock >= %s",
-                (detalle['cantidad'], detalle['producto_id'], detalle['cantidad'])
-            )
-
-        # Marcar pedido como pagado
-        cursor.execute(
-            "UPDATE pedidos SET estado = 'pagado' WHERE id = %s",
-            (pedido_id,)
-        )
-
-        conexion.commit()
-    except Exception as e:
-        conexion.rollback()
+        pagar_pedido(pedido, detalles)
+    except StockInsuficienteError:
+        flash('No hay stock suficiente para completar el pedido.', 'error')
+        return redirect(url_for('pedidos.pago', pedido_id=pedido_id))
+    except Error as e:
         print(f"Error al procesar pago: {e}")
         flash('Error al procesar el pago.', 'error')
         return redirect(url_for('pedidos.pago', pedido_id=pedido_id))
-    finally:
-        cursor.close()
-        conexion.close()
 
     # Limpiar carrito
-    session.pop('carrito', None)
-    session.modified = True
+    vaciar_carrito()
 
     flash(f'¡Pago procesado exitosamente! Tu número de orden es: {pedido["numero_orden"]}', 'exito')
     return redirect(url_for('pedidos.confirmacion', pedido_id=pedido_id))
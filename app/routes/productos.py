@@ -1,67 +1,198 @@
-from flask import Blueprint, request, render_template, jsonify
-from db import ejecutar_consulta
+import base64
+import binascii
+from datetime import datetime
+from flask import Blueprint, request, render_template, url_for
+from db import ejecutar_consulta, consultar_en_paralelo
+from consultas import obtener_categorias, cache_catalogo
+from busqueda import normalizar, condicion_busqueda, ids_por_relevancia, productos_por_ids
+from relacionados import obtener_relacionados
+from cache_http import respuesta_condicional
+from respuestas import respuesta_json
+from config import Configuracion
 
 productos_bp = Blueprint('productos', __name__)
 
 
-@productos_bp.route('/catalogo')
-def catalogo():
-    """Página del catálogo de productos con filtros"""
-    # Obtener parámetros de búsqueda
-    busqueda = request.args.get('busqueda', '').strip()
-    categoria_id = request.args.get('categoria', '', type=str)
-    precio_min = request.args.get('precio_min', 0, type=float)
-    precio_max = request.args.get('precio_max', 99999, type=float)
-    pagina = request.args.get('pagina', 1, type=int)
-    por_pagina = 12
+def codificar_cursor(producto):
+    """Cursor opaco con la posición (fecha_creacion, id) de un producto"""
+    texto = f"{producto['fecha_creacion'].isoformat()}|{producto['id']}"
+    return base64.urlsafe_b64encode(texto.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Devuelve (fecha_creacion, id) de un cursor, o None si no es válido"""
+    if not cursor:
+        return None
+    try:
+        texto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        fecha, producto_id = texto.split('|')
+        return datetime.fromisoformat(fecha), int(producto_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
 
-    # Construir consulta dinámica con parámetros preparados
-    consulta = "SELECT p.*, c.nombre as categoria_nombre FROM productos p LEFT JOIN categorias c ON p.categoria_id = c.id WHERE p.activo = 1"
+def filtros_catalogo(busqueda, categoria_id, precio_min=0, precio_max=99999, con_stock=False):
+    """
+    Condiciones WHERE y parámetros comunes al catálogo y a la API.
+
+    Returns:
+        (condiciones, parametros, expresion): `expresion` es la búsqueda
+        FULLTEXT para ordenar por relevancia, o None si no hay búsqueda.
+    """
+    condiciones = "p.activo = 1"
     parametros = []
+    expresion = None
 
     if busqueda:
-        consulta += " AND (p.nombre LIKE %s OR p.descripcion LIKE %s)"
-        parametros.extend([f'%{busqueda}%', f'%{busqueda}%'])
+        condicion, parametros_busqueda, expresion = condicion_busqueda(busqueda)
+        if condicion:
+            condiciones += f" AND {condicion}"
+            parametros.extend(parametros_busqueda)
 
     if categoria_id:
-        consulta += " AND p.categoria_id = %s"
-        parametros.append(int(categoria_id))
+        condiciones += " AND p.categoria_id = %s"
+        parametros.append(categoria_id)
 
     if precio_min > 0:
-        consulta += " AND p.precio >= %s"
+        condiciones += " AND p.precio >= %s"
         parametros.append(precio_min)
 
     if precio_max < 99999:
-        consulta += " AND p.precio <= %s"
+        condiciones += " AND p.precio <= %s"
         parametros.append(precio_max)
 
-    # Contar total para paginación
-    consulta_conteo = consulta.replace(
-        "SELECT p.*, c.nombre as categoria_nombre",
-        "SELECT COUNT(*) as total"
-    )
-    total_resultado = ejecutar_consulta(consulta_conteo, tuple(parametros), obtener_uno=True)
-    total_productos = total_resultado['total'] if total_resultado else 0
-    total_paginas = max(1, (total_productos + por_pagina - 1) // por_pagina)
+    if con_stock:
+        condiciones += " AND p.stock > 0"
+
+    return condiciones, parametros, expresion
 
-    # Agregar orden y paginación
-    consulta += " ORDER BY p.fecha_creacion DESC LIMIT %s OFFSET %s"
-    parametros.extend([por_pagina, (pagina - 1) * por_pagina])
 
-    productos = ejecutar_consulta(consulta, tuple(parametros), obtener_todos=True) or []
+def consultar_pagina(columnas, condiciones, parametros, por_pagina, posicion=None, hacia_atras=False, desplazamiento=0):
+    """
+    Página de productos ordenada por (fecha_creacion, id) descendente.
 
-    # Obtener categorías para el filtro
-    categorias = ejecutar_consulta(
-        "SELECT * FROM categorias ORDER BY nombre",
-        obtener_todos=True
-    ) or []
+    Con `posicion` usa paginación por cursor (keyset): la consulta salta
+    directamente a la posición mediante el índice, así que cualquier
+    página cuesta lo mismo que la primera. `desplazamiento` solo se usa
+    para enlaces antiguos con ?pagina=N sin cursor.
 
-    # Obtener rango de precios
-    rango_precios = ejecutar_consulta(
+    Returns:
+        (filas, hay_mas): hay_mas indica si existen filas más allá de la
+        página en la dirección recorrida.
+    """
+    consulta = f"SELECT {columnas} FROM productos p LEFT JOIN categorias c ON p.categoria_id = c.id WHERE {condiciones}"
+    parametros = list(parametros)
+
+    if posicion:
+        fecha, producto_id = posicion
+        operador = '>' if hacia_atras else '<'
+        consulta += f" AND (p.fecha_creacion {operador} %s OR (p.fecha_creacion = %s AND p.id {operador} %s))"
+        parametros.extend([fecha, fecha, producto_id])
+
+    orden = 'ASC' if hacia_atras else 'DESC'
+    consulta += f" ORDER BY p.fecha_creacion {orden}, p.id {orden} LIMIT %s"
+    parametros.append(por_pagina + 1)
+    if desplazamiento:
+        consulta += " OFFSET %s"
+        parametros.append(desplazamiento)
+
+    filas = ejecutar_consulta(consulta, tuple(parametros), obtener_todos=True)
+    if filas is None:
+        return None
+    hay_mas = len(filas) > por_pagina
+    filas = filas[:por_pagina]
+    if hacia_atras:
+        filas.reverse()
+    return filas, hay_mas
+
+
+def contar_catalogo(condiciones, parametros):
+    """Total de productos que cumplen los filtros"""
+    resultado = ejecutar_consulta(
+        f"SELECT COUNT(*) as total FROM productos p WHERE {condiciones}",
+        tuple(parametros),
+        obtener_uno=True
+    )
+    return resultado['total'] if resultado else None
+
+
+def consultar_rango_precios():
+    """Precio mínimo y máximo de los productos activos"""
+    return ejecutar_consulta(
         "SELECT MIN(precio) as min_precio, MAX(precio) as max_precio FROM productos WHERE activo = 1",
         obtener_uno=True
     )
 
+
+@productos_bp.route('/catalogo')
+@respuesta_condicional('catalogo', cache_pagina=True)
+def catalogo():
+    """Página del catálogo de productos con filtros"""
+    # Obtener parámetros de búsqueda
+    busqueda = request.args.get('busqueda', '').strip()
+    categoria_id = request.args.get('categoria', '', type=str)
+    precio_min = request.args.get('precio_min', 0, type=float)
+    precio_max = request.args.get('precio_max', 99999, type=float)
+    pagina = max(1, request.args.get('pagina', 1, type=int))
+    despues = decodificar_cursor(request.args.get('despues'))
+    antes = None if despues else decodificar_cursor(request.args.get('antes'))
+    por_pagina = 12
+
+    # Los resultados se guardan en caché por combinación de filtros normalizada
+    categoria = int(categoria_id) if categoria_id else None
+    busqueda_normalizada = normalizar(busqueda)
+    filtros = (busqueda_normalizada, categoria, precio_min, precio_max)
+    condiciones, parametros, expresion = filtros_catalogo(*filtros)
+
+    # Consultas independientes entre sí: se lanzan a la vez
+    tareas = {
+        'rango_precios': lambda: cache_catalogo(('rango_precios',), consultar_rango_precios),
+        'categorias': obtener_categorias,
+    }
+
+    if expresion:
+        # Búsqueda por texto: la lista de IDs por relevancia se calcula una
+        # vez por combinación de filtros y cada página es un corte de ella
+        ids = cache_catalogo(
+            ('relevancia', *filtros), lambda: ids_por_relevancia(condiciones, parametros, expresion)
+        ) or []
+        total_productos = len(ids)
+        inicio = (pagina - 1) * por_pagina
+        tareas['productos'] = lambda: cache_catalogo(
+            ('pagina_relevancia', *filtros, pagina),
+            lambda: productos_por_ids("p.*, c.nombre as categoria_nombre", ids[inicio:inicio + por_pagina])
+        )
+        resultados = consultar_en_paralelo(tareas)
+        productos = resultados['productos'] or []
+        hay_anterior, hay_siguiente = pagina > 1, inicio + por_pagina < total_productos
+    else:
+        # El total se cuenta una vez por combinación de filtros, no por página
+        tareas['total'] = lambda: cache_catalogo(
+            ('conteo', *filtros), lambda: contar_catalogo(condiciones, parametros)
+        )
+
+        posicion = despues or antes
+        desplazamiento = 0 if posicion else (pagina - 1) * por_pagina
+        tareas['pagina'] = lambda: cache_catalogo(
+            ('pagina', *filtros, posicion, bool(antes), desplazamiento),
+            lambda: consultar_pagina("p.*, c.nombre as categoria_nombre", condiciones, parametros,
+                                     por_pagina, posicion, hacia_atras=bool(antes),
+                                     desplazamiento=desplazamiento)
+        )
+        resultados = consultar_en_paralelo(tareas)
+        total_productos = resultados['total'] or 0
+        productos, hay_mas = resultados['pagina'] or ([], False)
+
+        if antes:
+            hay_anterior, hay_siguiente = hay_mas, True
+        else:
+            hay_anterior, hay_siguiente = pagina > 1 or bool(despues), hay_mas
+
+    total_paginas = max(1, (total_productos + por_pagina - 1) // por_pagina)
+
+    rango_precios = resultados['rango_precios']
+    categorias = resultados['categorias']
+
     return render_template('catalogo.html',
                            productos=productos,
                            categorias=categorias,
@@ -72,10 +203,27 @@ def catalogo():
                            pagina=pagina,
                            total_paginas=total_paginas,
                            total_productos=total_productos,
+                           hay_anterior=hay_anterior,
+                           hay_siguiente=hay_siguiente,
+                           # En búsquedas por relevancia se pagina por número de página
+                           cursor_anterior=codificar_cursor(productos[0]) if productos and not expresion else None,
+                           cursor_siguiente=codificar_cursor(productos[-1]) if productos and not expresion else None,
                            rango_precios=rango_precios)
 
 
+def sello_producto(producto_id):
+    """Stock y estado de un producto: lo que cambia su página sin tocar el catálogo"""
+    fila = ejecutar_consulta(
+        "SELECT stock, activo FROM productos WHERE id = %s",
+        (producto_id,),
+        obtener_uno=True,
+        preparada=True
+    )
+    return (fila['stock'], fila['activo']) if fila else 0
+
+
 @productos_bp.route('/producto/<int:producto_id>')
+@respuesta_condicional('producto', extra=sello_producto)
 def detalle_producto(producto_id):
     """Vista detallada de un producto"""
     producto = ejecutar_consulta(
@@ -91,35 +239,109 @@ def detalle_producto(producto_id):
         return render_template('404.html'), 404
 
     # Productos relacionados (misma categoría)
-    relacionados = ejecutar_consulta(
-        """SELECT * FROM productos 
-           WHERE categoria_id = %s AND id != %s AND activo = 1 
-           ORDER BY RAND() LIMIT 4""",
-        (producto['categoria_id'], producto_id),
-        obtener_todos=True
-    ) or []
+    relacionados = obtener_relacionados(producto)
 
     return render_template('producto.html', producto=producto, relacionados=relacionados)
 
 
+# Campos que puede pedir la API con ?fields= y su expresión SQL
+CAMPOS_API = {
+    'id': 'p.id',
+    'nombre': 'p.nombre',
+    'descripcion': 'p.descripcion',
+    'precio': 'p.precio',
+    'stock': 'p.stock',
+    'imagen': 'p.imagen',
+    'categoria_id': 'p.categoria_id',
+    'categoria': 'c.nombre AS categoria',
+    'fecha_creacion': 'p.fecha_creacion',
+}
+CAMPOS_API_DEFECTO = ('id', 'nombre', 'precio', 'imagen', 'stock')
+
+
+def codificar_cursor_relevancia(indice):
+    """Cursor de una búsqueda por texto: posición en la lista por relevancia"""
+    return base64.urlsafe_b64encode(f"#{indice}".encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor_relevancia(cursor):
+    if not cursor:
+        return 0
+    try:
+        texto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('ascii')
+        return max(0, int(texto[1:])) if texto.startswith('#') else 0
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return 0
+
+
+def error_api(mensaje, estado=400):
+    return respuesta_json({'exito': False, 'mensaje': mensaje}, estado)
+
+
 @productos_bp.route('/api/productos')
+@respuesta_condicional('api')
 def api_productos():
-    """API JSON para obtener productos (usado por AJAX)"""
-    busqueda = request.args.get('busqueda', '').strip()
-    categoria_id = request.args.get('categoria', '', type=str)
+    """
+    API JSON de productos (autocompletado, clientes móviles).
 
-    consulta = "SELECT p.id, p.nombre, p.precio, p.imagen, p.stock FROM productos p WHERE p.activo = 1"
-    parametros = []
+    Parámetros (todos opcionales):
+        busqueda, categoria: mismos filtros que el catálogo
+        precio_min, precio_max: rango de precio
+        en_stock=1: solo productos con stock
+        fields=id,nombre,precio: campos de cada producto (ver CAMPOS_API);
+            solo se leen de la base de datos las columnas pedidas
+        limite: productos por página (por defecto 50, máximo API_MAX_LIMITE)
+        despues: cursor de la página siguiente
 
-    if busqueda:
-        consulta += " AND (p.nombre LIKE %s OR p.descripcion LIKE %s)"
-        parametros.extend([f'%{busqueda}%', f'%{busqueda}%'])
+    Si hay más resultados, la cabecera Link (rel="next") y
+    X-Cursor-Siguiente indican cómo pedir la página siguiente. Las
+    búsquedas por texto se paginan en orden de relevancia.
+    """
+    busqueda = normalizar(request.args.get('busqueda', ''))
+    categoria_id = request.args.get('categoria', '', type=str)
+    categoria = int(categoria_id) if categoria_id.isdigit() else None
+    precio_min = request.args.get('precio_min', 0, type=float)
+    precio_max = request.args.get('precio_max', 99999, type=float)
+    con_stock = request.args.get('en_stock') == '1'
+    por_pagina = min(max(request.args.get('limite', 50, type=int), 1), Configuracion.API_MAX_LIMITE)
 
-    if categoria_id:
-        consulta += " AND p.categoria_id = %s"
-        parametros.append(int(categoria_id))
+    pedidos = request.args.get('fields', '')
+    campos = tuple(dict.fromkeys(c.strip() for c in pedidos.split(',') if c.strip())) or CAMPOS_API_DEFECTO
+    desconocidos = [campo for campo in campos if campo not in CAMPOS_API]
+    if desconocidos:
+        return error_api(f"Campos no válidos: {', '.join(desconocidos)}. "
+                         f"Disponibles: {', '.join(CAMPOS_API)}")
+    # id y fecha_creacion siempre se leen: forman el cursor
+    columnas = ', '.join(dict.fromkeys(
+        ['p.id', 'p.fecha_creacion'] + [CAMPOS_API[campo] for campo in campos]
+    ))
 
-    consulta += " ORDER BY p.fecha_creacion DESC LIMIT 50"
-    productos = ejecutar_consulta(consulta, tuple(parametros), obtener_todos=True) or []
+    filtros = (busqueda, categoria, precio_min, precio_max, con_stock)
+    condiciones, parametros, expresion = filtros_catalogo(*filtros)
+    if expresion:
+        ids = cache_catalogo(
+            ('relevancia', *filtros),
+            lambda: ids_por_relevancia(condiciones, parametros, expresion)
+        ) or []
+        inicio = decodificar_cursor_relevancia(request.args.get('despues'))
+        productos = cache_catalogo(
+            ('api_relevancia', *filtros, campos, inicio, por_pagina),
+            lambda: productos_por_ids(columnas, ids[inicio:inicio + por_pagina])
+        ) or []
+        hay_mas = inicio + por_pagina < len(ids)
+        cursor = codificar_cursor_relevancia(inicio + por_pagina) if hay_mas else None
+    else:
+        despues = decodificar_cursor(request.args.get('despues'))
+        productos, hay_mas = cache_catalogo(
+            ('api', *filtros, campos, despues, por_pagina),
+            lambda: consultar_pagina(columnas, condiciones, parametros, por_pagina, despues)
+        ) or ([], False)
+        cursor = codificar_cursor(productos[-1]) if hay_mas and productos else None
 
-    return jsonify(productos)
+    respuesta = respuesta_json([{campo: producto[campo] for campo in campos} for producto in productos])
+    if cursor:
+        argumentos = {clave: valor for clave, valor in request.args.items() if clave != 'despues'}
+        siguiente = url_for('productos.api_productos', **argumentos, despues=cursor)
+        respuesta.headers['X-Cursor-Siguiente'] = cursor
+        respuesta.headers['Link'] = f'<{siguiente}>; rel="next"'
+    return respuesta
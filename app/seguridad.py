@@ -0,0 +1,121 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as EsperaAgotada
+import bcrypt
+from db import ejecutar_consulta
+from config import Configuracion
+
+
+class ServicioSaturadoError(Exception):
+    """Hay demasiadas operaciones de contraseña en curso; se responde 503"""
+
+
+_lock = threading.Lock()
+_ejecutor = None
+_ejecutor_pid = None
+_cupos = None
+
+
+def _obtener_ejecutor():
+    """
+    Pool de hilos para bcrypt, creado al primer uso en cada proceso.
+
+    bcrypt libera el GIL mientras calcula, así que los hilos sí trabajan
+    en paralelo. El semáforo limita las tareas en curso más las que
+    esperan (HASH_HILOS + HASH_COLA).
+    """
+    global _ejecutor, _ejecutor_pid, _cupos
+    if _ejecutor_pid != os.getpid():
+        with _lock:
+            if _ejecutor_pid != os.getpid():
+                _ejecutor = ThreadPoolExecutor(max_workers=Configuracion.HASH_HILOS,
+                                               thread_name_prefix='bcrypt')
+                _cupos = threading.BoundedSemaphore(Configuracion.HASH_HILOS + Configuracion.HASH_COLA)
+                _ejecutor_pid = os.getpid()
+    return _ejecutor, _cupos
+
+
+def reiniciar():
+    """Descarta el pool actual; el siguiente uso crea uno con la configuración vigente"""
+    global _ejecutor, _ejecutor_pid
+    with _lock:
+        if _ejecutor is not None and _ejecutor_pid == os.getpid():
+            _ejecutor.shutdown(wait=True)
+        _ejecutor = None
+        _ejecutor_pid = None
+
+
+def _enviar(funcion, *args):
+    """Encola `funcion` en el pool o falla de inmediato si no hay cupo"""
+    ejecutor, cupos = _obtener_ejecutor()
+    if not cupos.acquire(blocking=False):
+        raise ServicioSaturadoError("Pool de contraseñas saturado")
+    try:
+        futuro = ejecutor.submit(funcion, *args)
+    except BaseException:
+        cupos.release()
+        raise
+    futuro.add_done_callback(lambda _: cupos.release())
+    return futuro
+
+
+def _ejecutar(funcion, *args):
+    futuro = _enviar(funcion, *args)
+    try:
+        return futuro.result(timeout=Configuracion.HASH_ESPERA)
+    except EsperaAgotada:
+        futuro.cancel()
+        raise ServicioSaturadoError("Tiempo de espera agotado en el pool de contraseñas")
+
+
+def _hashear(password, costo):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=costo)).decode('utf-8')
+
+
+def _verificar(password, hash_guardado):
+    return bcrypt.checkpw(password.encode('utf-8'), hash_guardado.encode('utf-8'))
+
+
+def generar_hash(password):
+    """Hash bcrypt de `password` con el costo BCRYPT_COSTO"""
+    return _ejecutar(_hashear, password, Configuracion.BCRYPT_COSTO)
+
+
+def verificar_password(password, hash_guardado):
+    """Comprueba `password` contra un hash bcrypt guardado"""
+    return _ejecutar(_verificar, password, hash_guardado)
+
+
+def costo_hash(hash_guardado):
+    """Costo (rondas) de un hash bcrypt: '$2b$12$...' -> 12"""
+    try:
+        return int(hash_guardado.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def necesita_rehash(hash_guardado):
+    return costo_hash(hash_guardado) != Configuracion.BCRYPT_COSTO
+
+
+def _rehashear_usuario(usuario_id, password, hash_anterior):
+    nuevo = _hashear(password, Configuracion.BCRYPT_COSTO)
+    # Solo si nadie cambió la contraseña mientras tanto
+    ejecutar_consulta(
+        "UPDATE usuarios SET password = %s WHERE id = %s AND password = %s",
+        (nuevo, usuario_id, hash_anterior)
+    )
+
+
+def rehashear_si_hace_falta(usuario_id, password, hash_guardado):
+    """
+    Tras un login correcto, vuelve a calcular el hash si se guardó con
+    otro costo. Se hace en segundo plano para no alargar el login; si el
+    pool está saturado se deja para el próximo inicio de sesión.
+    """
+    if not necesita_rehash(hash_guardado):
+        return
+    try:
+        _enviar(_rehashear_usuario, usuario_id, password, hash_guardado)
+    except ServicioSaturadoError:
+        pass
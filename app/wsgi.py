@@ -0,0 +1,13 @@
+"""
+Punto de entrada WSGI para producción.
+
+    flask --app "app:crear_app()" migrar      # una vez por despliegue
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Con preload_app (ver gunicorn.conf.py) este módulo se importa una sola
+vez en el proceso maestro y los workers heredan la aplicación al hacer
+fork. Arrancar no toca el esquema: las migraciones van aparte.
+"""
+from app import crear_app
+
+app = crear_app()
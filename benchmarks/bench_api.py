@@ -0,0 +1,84 @@
+"""
+Tamaño y tiempo de serialización de las respuestas de /api/productos.
+
+Genera páginas sintéticas de productos (no necesita base de datos) y,
+para cada tamaño de página y selección de campos, compara:
+
+- serialización con jsonify de Flask y con respuestas.serializar_json
+  (orjson si está instalado);
+- tamaño del cuerpo sin comprimir, con gzip y con brotli (si está
+  instalado), y el tiempo de cada compresión.
+
+    python benchmarks/bench_api.py [repeticiones]
+"""
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import comun
+from flask import Flask, jsonify
+import respuestas
+from config import Configuracion
+from routes.productos import CAMPOS_API_DEFECTO
+
+TAMANOS = [20, 50, 200]
+CAMPOS = {
+    'por defecto': CAMPOS_API_DEFECTO,
+    'autocompletado': ('id', 'nombre'),
+    'todos': ('id', 'nombre', 'descripcion', 'precio', 'stock', 'imagen',
+              'categoria_id', 'categoria', 'fecha_creacion'),
+}
+
+
+def generar_productos(cantidad):
+    ahora = datetime(2025, 1, 1)
+    return [{
+        'id': i,
+        'nombre': f'Producto de prueba número {i}',
+        'descripcion': 'Descripción de ejemplo con varias palabras repetidas. ' * 4,
+        'precio': Decimal(f'{(i * 37) % 500 + 0.99:.2f}'),
+        'stock': i % 40,
+        'imagen': f'{i:020x}.jpg',
+        'categoria_id': i % 5 + 1,
+        'categoria': ['Electrónica', 'Ropa', 'Hogar', 'Deportes', 'Libros'][i % 5],
+        'fecha_creacion': ahora - timedelta(hours=i),
+    } for i in range(1, cantidad + 1)]
+
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    app = Flask(__name__)
+    serializador = 'orjson' if respuestas.orjson else 'json (sin orjson)'
+
+    filas_tiempo = []
+    print(f"\n{'caso':<34} {'JSON B':>9} {'gzip B':>9} {'br B':>9} {'gzip ms':>9} {'br ms':>9}")
+    for tamano in TAMANOS:
+        productos = generar_productos(tamano)
+        for nombre, campos in CAMPOS.items():
+            datos = [{campo: producto[campo] for campo in campos} for producto in productos]
+            caso = f'{tamano} productos, {nombre}'
+
+            with app.app_context():
+                filas_tiempo.append((f'{caso} (jsonify)', comun.medir(lambda: jsonify(datos).get_data(),
+                                                                     repeticiones)))
+            filas_tiempo.append((f'{caso} ({serializador})',
+                                 comun.medir(lambda: respuestas.serializar_json(datos), repeticiones)))
+
+            cuerpo = respuestas.serializar_json(datos)
+            con_gzip = respuestas.comprimir(cuerpo, 'gzip')
+            tiempo_gzip = comun.medir(lambda: respuestas.comprimir(cuerpo, 'gzip'), repeticiones // 5)
+            if respuestas.brotli:
+                tamano_br = str(len(respuestas.comprimir(cuerpo, 'br')))
+                tiempo_br = f"{comun.medir(lambda: respuestas.comprimir(cuerpo, 'br'), repeticiones // 5)['p50']:.3f}"
+            else:
+                tamano_br = tiempo_br = '-'
+            print(f"{caso:<34} {len(cuerpo):>9} {len(con_gzip):>9} {tamano_br:>9} "
+                  f"{tiempo_gzip['p50']:>9.3f} {tiempo_br:>9}")
+
+    print(f"\n(gzip nivel {Configuracion.API_GZIP_NIVEL}, brotli calidad {Configuracion.API_BROTLI_CALIDAD}; "
+          f"las respuestas menores de {Configuracion.API_COMPRIMIR_MIN} B no se comprimen)")
+    comun.imprimir_tabla('Serialización JSON', filas_tiempo)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Compara la búsqueda LIKE '%termino%' con la búsqueda FULLTEXT.
+
+Crea una tabla temporal `productos_bench` con la misma estructura (e
+índices) que `productos`, la llena con productos sintéticos y mide ambas
+consultas para varios términos. La tabla se elimina al terminar.
+
+    DB_HOST=127.0.0.1 python benchmarks/bench_busqueda.py [productos] [repeticiones]
+"""
+import random
+import sys
+
+import comun
+from busqueda import condicion_busqueda
+from config import Configuracion
+from db import ejecutar_consulta, obtener_conexion
+
+PALABRAS = [
+    'laptop', 'teléfono', 'audífonos', 'cámara', 'camiseta', 'pantalón', 'chaqueta', 'lámpara',
+    'sábanas', 'balón', 'mancuernas', 'novela', 'teclado', 'mochila', 'electrónica', 'algodón',
+    'inalámbrico', 'premium', 'deportivo', 'clásico', 'ajustable', 'ergonómico', 'portátil',
+    'resistente', 'orgánico', 'edición', 'especial', 'batería', 'pantalla', 'cocina', 'jardín',
+]
+TERMINOS = ['electronica', 'Cámara', 'inalambrico bateria', 'ergonómico portátil premium']
+
+
+def poblar(total):
+    conexion = obtener_conexion()
+    cursor = conexion.cursor()
+    cursor.execute("DROP TABLE IF EXISTS productos_bench")
+    cursor.execute("CREATE TABLE productos_bench LIKE productos")
+    aleatorio = random.Random(42)
+    lote = []
+    for i in range(total):
+        nombre = ' '.join(aleatorio.sample(PALABRAS, 3)).capitalize()
+        descripcion = ' '.join(aleatorio.choices(PALABRAS, k=25))
+        lote.append((nombre, descripcion, round(aleatorio.uniform(10, 20000), 2), aleatorio.randint(0, 100)))
+        if len(lote) == 5000 or i == total - 1:
+            cursor.executemany(
+                "INSERT INTO productos_bench (nombre, descripcion, precio, stock) VALUES (%s, %s, %s, %s)",
+                lote
+            )
+            lote = []
+    cursor.close()
+    conexion.close()
+
+
+def buscar_like(termino):
+    return ejecutar_consulta(
+        """SELECT p.id FROM productos_bench p
+           WHERE p.activo = 1 AND (p.nombre LIKE %s OR p.descripcion LIKE %s)
+           ORDER BY p.fecha_creacion DESC LIMIT 12""",
+        (f'%{termino}%', f'%{termino}%'),
+        obtener_todos=True
+    )
+
+
+def buscar_fulltext(termino):
+    # La misma consulta que busqueda.ids_por_relevancia, sobre productos_bench
+    condicion, parametros, expresion = condicion_busqueda(termino)
+    return ejecutar_consulta(
+        f"""SELECT p.id FROM productos_bench p WHERE p.activo = 1 AND {condicion}
+            ORDER BY 2 * MATCH(p.nombre) AGAINST (%s IN BOOLEAN MODE)
+                     + MATCH(p.nombre, p.descripcion) AGAINST (%s IN BOOLEAN MODE) DESC,
+                     p.id DESC
+            LIMIT %s""",
+        (*parametros, expresion, expresion, Configuracion.BUSQUEDA_MAX_RESULTADOS),
+        obtener_todos=True
+    )
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    print(f"Poblando productos_bench con {total} productos...")
+    poblar(total)
+    try:
+        filas = []
+        for termino in TERMINOS:
+            coincidencias = (len(buscar_like(termino) or []), len(buscar_fulltext(termino) or []))
+            print(f"'{termino}': LIKE -> {coincidencias[0]} filas (máx. 12), FULLTEXT -> {coincidencias[1]} ids")
+            filas.append((f"LIKE '{termino}'", comun.medir(lambda: buscar_like(termino), repeticiones, 2)))
+            filas.append((f"FULLTEXT '{termino}'", comun.medir(lambda: buscar_fulltext(termino), repeticiones, 2)))
+        comun.imprimir_tabla(f'Búsqueda sobre {total} productos', filas)
+    finally:
+        ejecutar_consulta("DROP TABLE IF EXISTS productos_bench")
+
+
+if __name__ == '__main__':
+    main()
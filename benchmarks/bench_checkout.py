@@ -0,0 +1,120 @@
+"""
+Latencia del checkout según el tamaño del carrito.
+
+Compara las consultas del checkout original, copiadas de la vista
+anterior (un SELECT de stock y un INSERT de detalle_pedido por
+producto), con crear_pedido(), que usa un único SELECT ... FOR UPDATE y
+un INSERT de varias filas. Crea productos de prueba con stock de sobra
+y borra los pedidos y productos al terminar.
+
+    DB_HOST=127.0.0.1 python benchmarks/bench_checkout.py [repeticiones]
+"""
+import sys
+
+import comun
+from db import ejecutar_consulta, obtener_conexion
+from routes.pedidos import crear_pedido, generar_numero_orden
+
+TAMANOS = (1, 5, 10, 30, 60)
+
+
+def checkout_original(usuario_id, carrito, direccion, telefono):
+    """
+    Las consultas del checkout() original, copiadas tal cual y en el mismo
+    orden: un SELECT de stock por producto, el INSERT del pedido y los
+    INSERT de detalle_pedido uno a uno en otra conexión.
+    """
+    # Verificar stock de todos los productos
+    for str_id, item in carrito.items():
+        producto = ejecutar_consulta(
+            "SELECT stock FROM productos WHERE id = %s",
+            (item['producto_id'],),
+            obtener_uno=True
+        )
+        if not producto or producto['stock'] < item['cantidad']:
+            raise RuntimeError(f"Stock insuficiente para {item['nombre']}")
+
+    # Calcular total
+    total = sum(item['precio'] * item['cantidad'] for item in carrito.values())
+
+    # Generar número de orden
+    numero_orden = generar_numero_orden()
+
+    # Crear pedido
+    pedido_id = ejecutar_consulta(
+        """INSERT INTO pedidos (usuario_id, numero_orden, total, estado, direccion_envio, telefono)
+           VALUES (%s, %s, %s, 'pendiente', %s, %s)""",
+        (usuario_id, numero_orden, total, direccion, telefono),
+        obtener_id=True
+    )
+
+    if not pedido_id:
+        raise RuntimeError("Error al crear el pedido")
+
+    # Insertar detalles del pedido
+    conexion = obtener_conexion()
+    try:
+        cursor = conexion.cursor()
+        for item in carrito.values():
+            subtotal = item['precio'] * item['cantidad']
+            cursor.execute(
+                """INSERT INTO detalle_pedido (pedido_id, producto_id, cantidad, precio_unitario, subtotal)
+                   VALUES (%s, %s, %s, %s, %s)""",
+                (pedido_id, item['producto_id'], item['cantidad'], item['precio'], subtotal)
+            )
+        conexion.commit()
+    except Exception:
+        conexion.rollback()
+        raise
+    finally:
+        cursor.close()
+        conexion.close()
+    return pedido_id
+
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    usuario = ejecutar_consulta(
+        "SELECT id FROM usuarios WHERE email = %s", ('admin@tienda.com',), obtener_uno=True
+    )
+    if not usuario:
+        sys.exit("No existe el usuario admin@tienda.com; inicia la aplicación una vez primero.")
+
+    ids = [
+        ejecutar_consulta(
+            "INSERT INTO productos (nombre, descripcion, precio, stock, activo) VALUES (%s, '', 10.00, 1000000, 0)",
+            (f'bench-checkout-{i}',),
+            obtener_id=True
+        )
+        for i in range(max(TAMANOS))
+    ]
+    pedidos = []
+    try:
+        filas = []
+        for tamano in TAMANOS:
+            carrito = {
+                str(producto_id): {'producto_id': producto_id, 'nombre': f'bench-checkout-{i}',
+                                   'precio': 10.0, 'cantidad': 1}
+                for i, producto_id in enumerate(ids[:tamano])
+            }
+            for nombre, funcion in (('original', checkout_original), ('en lote', crear_pedido)):
+                stats = comun.medir(
+                    lambda: pedidos.append(funcion(usuario['id'], carrito, 'Calle 1', '000')),
+                    repeticiones,
+                    calentamiento=5
+                )
+                filas.append((f"{tamano:>3} productos [{nombre}]", stats))
+        comun.imprimir_tabla('Latencia de checkout por tamaño de carrito', filas)
+    finally:
+        for inicio in range(0, len(pedidos), 1000):
+            lote = pedidos[inicio:inicio + 1000]
+            ejecutar_consulta(
+                f"DELETE FROM pedidos WHERE id IN ({', '.join(['%s'] * len(lote))})", tuple(lote)
+            )
+        ejecutar_consulta(
+            f"DELETE FROM productos WHERE id IN ({', '.join(['%s'] * len(ids))})", tuple(ids)
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Compara consultas de texto contra sentencias preparadas en caché.
+
+Mide las consultas más frecuentes de la tienda (producto por id, stock,
+usuario por email y listado de categorías) ejecutadas con
+ejecutar_consulta() en ambos modos sobre la misma conexión del pool.
+
+    DB_HOST=127.0.0.1 python benchmarks/bench_consultas_preparadas.py [repeticiones]
+"""
+import sys
+
+import comun
+from db import ejecutar_consulta
+
+CONSULTAS = [
+    ('agregar_al_carrito: producto por id',
+     "SELECT id, nombre, precio, stock, imagen FROM productos WHERE id = %s AND activo = 1",
+     (1,), {'obtener_uno': True}),
+    ('actualizar_carrito: stock',
+     "SELECT stock FROM productos WHERE id = %s",
+     (1,), {'obtener_uno': True}),
+    ('login: usuario por email',
+     "SELECT id, nombre, email, password, rol FROM usuarios WHERE email = %s",
+     ('admin@tienda.com',), {'obtener_uno': True}),
+    ('contexto_global: categorías',
+     "SELECT * FROM categorias ORDER BY nombre",
+     (), {'obtener_todos': True}),
+]
+
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    filas = []
+    for nombre, consulta, parametros, modo in CONSULTAS:
+        for preparada in (False, True):
+            stats = comun.medir(
+                lambda: ejecutar_consulta(consulta, parametros, preparada=preparada, **modo),
+                repeticiones
+            )
+            filas.append((f"{nombre} [{'preparada' if preparada else 'texto'}]", stats))
+    comun.imprimir_tabla('Latencia parse+execute por consulta', filas)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Rendimiento de la verificación de contraseñas según el tamaño del pool.
+
+Simula muchos logins simultáneos (hilos cliente) llamando a
+verificar_password() durante unos segundos con cada tamaño de pool
+(HASH_HILOS) y reporta logins por segundo, latencia y rechazos 503 por
+saturación. No necesita base de datos.
+
+    python benchmarks/bench_login.py [segundos] [clientes] [costo]
+"""
+import os
+import sys
+import threading
+import time
+
+import comun
+import bcrypt
+import seguridad
+from config import Configuracion
+
+
+def medir_pool(hilos, clientes, segundos, hash_guardado):
+    Configuracion.HASH_HILOS = hilos
+    seguridad.reiniciar()
+    latencias = []
+    rechazos = 0
+    lock = threading.Lock()
+    fin = time.perf_counter() + segundos
+
+    def cliente():
+        nonlocal rechazos
+        propias, rechazadas = [], 0
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            try:
+                seguridad.verificar_password('admin123', hash_guardado)
+                propias.append((time.perf_counter() - inicio) * 1000)
+            except seguridad.ServicioSaturadoError:
+                rechazadas += 1
+                time.sleep(0.005)
+        with lock:
+            latencias.extend(propias)
+            rechazos += rechazadas
+
+    hilos_cliente = [threading.Thread(target=cliente) for _ in range(clientes)]
+    for hilo in hilos_cliente:
+        hilo.start()
+    for hilo in hilos_cliente:
+        hilo.join()
+    return {
+        'logins_s': len(latencias) / segundos,
+        'p50': comun.percentil(latencias, 50),
+        'p99': comun.percentil(latencias, 99),
+        'rechazos': rechazos,
+    }
+
+
+def main():
+    segundos = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    clientes = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    costo = int(sys.argv[3]) if len(sys.argv) > 3 else Configuracion.BCRYPT_COSTO
+    hash_guardado = bcrypt.hashpw(b'admin123', bcrypt.gensalt(rounds=costo)).decode('utf-8')
+    tamanos = sorted({1, 2, 4, os.cpu_count() or 2, 2 * (os.cpu_count() or 2)})
+
+    print(f"\nLogins simultáneos: {clientes} clientes, costo bcrypt {costo}, "
+          f"cola {Configuracion.HASH_COLA}, {segundos:.0f} s por caso")
+    print(f"{'hilos del pool':<16} {'logins/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'rechazos 503':>14}")
+    for hilos in tamanos:
+        stats = medir_pool(hilos, clientes, segundos, hash_guardado)
+        print(f"{hilos:<16} {stats['logins_s']:>10.1f} {stats['p50']:>10.1f} "
+              f"{stats['p99']:>10.1f} {stats['rechazos']:>14}")
+    seguridad.reiniciar()
+
+
+if __name__ == '__main__':
+    main()
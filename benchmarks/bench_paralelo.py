@@ -0,0 +1,64 @@
+"""
+Latencia de las rutas que lanzan consultas independientes, en orden y
+en paralelo (consultar_en_paralelo).
+
+Pide /, /catalogo y /admin/ con el cliente de pruebas de Flask contra la
+base de datos configurada, primero con DB_PARALELO_HILOS=0 (todas las
+consultas en orden) y luego con cada tamaño indicado, y reporta p50/p99
+por ruta. Antes de cada petición se vacían las cachés del proceso para
+medir siempre las consultas y no la caché.
+
+    python benchmarks/bench_paralelo.py [repeticiones] [hilos...]
+"""
+import sys
+
+import comun
+import cache_http
+import consultas
+import db
+import fragmentos
+from app import crear_app
+from config import Configuracion
+
+RUTAS = ['/', '/catalogo', '/catalogo?busqueda=camiseta', '/admin/']
+
+
+def vaciar_caches():
+    # Solo las cachés en memoria: invalidar_catalogo() además escribe en la base
+    consultas._cache_catalogo.invalidar()
+    consultas._cache_categorias.invalidar()
+    cache_http._cache_paginas.invalidar()
+    fragmentos.invalidar_fragmentos()
+
+
+def main():
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    tamanos = [int(valor) for valor in sys.argv[2:]] or [2, 4, 8]
+    Configuracion.CACHE_PAGINAS_TTL = 0
+
+    app = crear_app()
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        # /admin/ necesita un administrador; no se usa la base de datos para esto
+        sesion['usuario_id'] = 0
+        sesion['usuario_rol'] = 'admin'
+        sesion['usuario_nombre'] = 'benchmark'
+
+    filas = []
+    for hilos in [0] + tamanos:
+        Configuracion.DB_PARALELO_HILOS = hilos
+        db.reiniciar_pool()  # el pool de hilos se crea con el tamaño vigente
+        for ruta in RUTAS:
+            def pedir():
+                vaciar_caches()
+                respuesta = cliente.get(ruta)
+                if respuesta.status_code != 200:
+                    raise RuntimeError(f"{ruta} respondió {respuesta.status_code}")
+            etiqueta = 'en orden' if hilos == 0 else f'{hilos} hilos'
+            filas.append((f'{ruta} ({etiqueta})', comun.medir(pedir, repeticiones, calentamiento=10)))
+
+    comun.imprimir_tabla('Rutas con consultas independientes', filas)
+
+
+if __name__ == '__main__':
+    main()
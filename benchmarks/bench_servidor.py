@@ -0,0 +1,82 @@
+"""
+Carga HTTP contra un servidor en marcha: peticiones por segundo y latencia.
+
+Sirve para comparar el servidor de desarrollo (python app.py) con
+gunicorn (wsgi.py + gunicorn.conf.py) sobre las mismas rutas. Cada
+cliente mantiene su conexión abierta (keep-alive) y pide las rutas en
+ciclo durante el tiempo indicado. El procedimiento está en
+docs/manual_tecnico.md, sección 9.
+
+    python benchmarks/bench_servidor.py http://127.0.0.1:5000 [clientes] [segundos] [rutas...]
+"""
+import http.client
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import comun
+
+RUTAS = ['/', '/catalogo', '/producto/1', '/api/productos']
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    destino = urlsplit(sys.argv[1])
+    clientes = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    segundos = float(sys.argv[3]) if len(sys.argv) > 3 else 20
+    rutas = sys.argv[4:] or RUTAS
+
+    latencias = {ruta: [] for ruta in rutas}
+    errores = []
+    lock = threading.Lock()
+    fin = time.perf_counter() + segundos
+
+    def cliente(desfase):
+        propias = {ruta: [] for ruta in rutas}
+        fallos = 0
+        conexion = http.client.HTTPConnection(destino.hostname, destino.port or 80, timeout=30)
+        i = desfase
+        while time.perf_counter() < fin:
+            ruta = rutas[i % len(rutas)]
+            i += 1
+            inicio = time.perf_counter()
+            try:
+                conexion.request('GET', ruta)
+                respuesta = conexion.getresponse()
+                respuesta.read()
+                if respuesta.status >= 500:
+                    fallos += 1
+                else:
+                    propias[ruta].append((time.perf_counter() - inicio) * 1000)
+                if respuesta.getheader('Connection', '').lower() == 'close':
+                    conexion.close()
+            except (OSError, http.client.HTTPException):
+                fallos += 1
+                conexion.close()
+        conexion.close()
+        with lock:
+            for ruta, valores in propias.items():
+                latencias[ruta].extend(valores)
+            errores.append(fallos)
+
+    hilos = [threading.Thread(target=cliente, args=(i,)) for i in range(clientes)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    total = sum(len(valores) for valores in latencias.values())
+    print(f"\n{sys.argv[1]}: {clientes} clientes, {segundos:.0f} s")
+    print(f"{'ruta':<24} {'peticiones':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for ruta, valores in latencias.items():
+        print(f"{ruta:<24} {len(valores):>10} {comun.percentil(valores, 50):>10.1f} "
+              f"{comun.percentil(valores, 99):>10.1f}")
+    todas = [valor for valores in latencias.values() for valor in valores]
+    print(f"{'total':<24} {total:>10} {comun.percentil(todas, 50):>10.1f} {comun.percentil(todas, 99):>10.1f}")
+    print(f"\nPeticiones/s: {total / segundos:.1f}   errores: {sum(errores)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Utilidades compartidas por los benchmarks.
+
+Los benchmarks se ejecutan contra una base de datos real configurada con
+las mismas variables de entorno que la aplicación (DB_HOST, MYSQL_USER, ...):
+
+    docker-compose up -d db
+    DB_HOST=127.0.0.1 python benchmarks/<benchmark>.py
+"""
+import os
+import statistics
+import sys
+import time
+
+# Permite importar los módulos de la aplicación (config, db, routes, ...)
+RUTA_APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+if RUTA_APP not in sys.path:
+    sys.path.insert(0, RUTA_APP)
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) de una lista de valores"""
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def medir(funcion, repeticiones=1000, calentamiento=50):
+    """Ejecuta `funcion` varias veces y devuelve sus latencias en ms"""
+    for _ in range(calentamiento):
+        funcion()
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return {
+        'n': repeticiones,
+        'media': statistics.fmean(tiempos),
+        'p50': percentil(tiempos, 50),
+        'p99': percentil(tiempos, 99),
+    }
+
+
+def imprimir_tabla(titulo, filas):
+    """Imprime filas de resultados (nombre, stats) en formato tabla"""
+    print(f"\n{titulo}")
+    print(f"{'caso':<40} {'n':>7} {'media ms':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for nombre, stats in filas:
+        print(f"{nombre:<40} {stats['n']:>7} {stats['media']:>10.3f} "
+              f"{stats['p50']:>10.3f} {stats['p99']:>10.3f}")
@@ -0,0 +1,122 @@
+"""
+Prueba de estrés: muchos pagos en paralelo sobre un producto escaso.
+
+Crea un producto con STOCK unidades y PEDIDOS pedidos pendientes de una
+unidad cada uno (más una línea de un segundo producto con stock de
+sobra), y los paga todos a la vez con pagar_pedido() desde varios
+hilos. Al final comprueba que no se vendió de más: el stock no es
+negativo, los pedidos pagados coinciden con las unidades descontadas y
+ningún pedido rechazado quedó a medias. Los pagos revertidos por
+interbloqueo se informan aparte; no cuentan como sobreventa.
+
+    DB_HOST=127.0.0.1 python benchmarks/estres_pagos.py [pedidos] [stock] [hilos]
+"""
+import sys
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import comun  # noqa: F401  (agrega app/ al path)
+from mysql.connector import Error
+from db import ejecutar_consulta
+from resumen_ventas import reconstruir_resumenes
+from routes.pedidos import crear_pedido, pagar_pedido, StockInsuficienteError
+
+
+def main():
+    pedidos = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    stock = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    hilos = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+
+    usuario = ejecutar_consulta(
+        "SELECT id FROM usuarios WHERE email = %s", ('admin@tienda.com',), obtener_uno=True
+    )
+    if not usuario:
+        sys.exit("No existe el usuario admin@tienda.com; inicia la aplicación una vez primero.")
+
+    escaso = ejecutar_consulta(
+        "INSERT INTO productos (nombre, descripcion, precio, stock, activo) VALUES ('bench-escaso', '', 10.00, %s, 0)",
+        (stock,),
+        obtener_id=True
+    )
+    abundante = ejecutar_consulta(
+        "INSERT INTO productos (nombre, descripcion, precio, stock, activo) VALUES ('bench-abundante', '', 5.00, %s, 0)",
+        (pedidos * 10,),
+        obtener_id=True
+    )
+    carrito = {
+        str(escaso): {'producto_id': escaso, 'nombre': 'bench-escaso', 'precio': 10.0, 'cantidad': 1},
+        str(abundante): {'producto_id': abundante, 'nombre': 'bench-abundante', 'precio': 5.0, 'cantidad': 2},
+    }
+    ids = [crear_pedido(usuario['id'], carrito, 'Calle 1', '000') for _ in range(pedidos)]
+    detalles = [{'producto_id': escaso}, {'producto_id': abundante}]
+
+    errores = ["interrumpido"]
+    resultados = Counter()
+    lock = threading.Lock()
+    simultaneos = min(hilos, pedidos)
+    barrera = threading.Barrier(simultaneos)
+
+    def pagar(pedido_id, esperar):
+        if esperar:
+            barrera.wait()
+        pedido = ejecutar_consulta(
+            "SELECT id, total, fecha, estado FROM pedidos WHERE id = %s", (pedido_id,), obtener_uno=True
+        )
+        try:
+            pagar_pedido(pedido, detalles)
+            resultado = 'pagado'
+        except StockInsuficienteError:
+            resultado = 'sin stock'
+        except Error as e:
+            # Un interbloqueo detectado por InnoDB revierte el pago completo
+            resultado = f'error: {getattr(e, "msg", e)}'
+        with lock:
+            resultados[resultado] += 1
+
+    try:
+        with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+            # Los primeros `hilos` pagos arrancan juntos para maximizar la contención
+            list(ejecutor.map(pagar, ids, [i < simultaneos for i in range(len(ids))]))
+
+        final = ejecutar_consulta(
+            "SELECT stock FROM productos WHERE id = %s", (escaso,), obtener_uno=True
+        )['stock']
+        final_abundante = ejecutar_consulta(
+            "SELECT stock FROM productos WHERE id = %s", (abundante,), obtener_uno=True
+        )['stock']
+        pagados = ejecutar_consulta(
+            f"SELECT COUNT(*) AS total FROM pedidos WHERE estado = 'pagado' AND id IN ({', '.join(['%s'] * len(ids))})",
+            tuple(ids),
+            obtener_uno=True
+        )['total']
+
+        print(f"\nPagos en paralelo: {pedidos} pedidos, stock inicial {stock}, {hilos} hilos")
+        for resultado, veces in resultados.most_common():
+            print(f"  {resultado:<40} {veces:>6}")
+        print(f"  {'pedidos pagados':<40} {pagados:>6}")
+        print(f"  {'stock final (escaso)':<40} {final:>6}")
+        print(f"  {'stock final (abundante)':<40} {final_abundante:>6}")
+
+        errores = []
+        if final < 0:
+            errores.append("stock negativo")
+        if stock - final != pagados:
+            errores.append("las unidades descontadas no coinciden con los pedidos pagados")
+        if pedidos * 10 - final_abundante != 2 * pagados:
+            errores.append("un pedido rechazado descontó stock de otro producto")
+        if pagados > min(pedidos, stock):
+            errores.append(f"se pagaron más de {min(pedidos, stock)} pedidos")
+        print("\nOK: sin sobreventa" if not errores else "\nFALLO: " + "; ".join(errores))
+    finally:
+        ejecutar_consulta(
+            f"DELETE FROM pedidos WHERE id IN ({', '.join(['%s'] * len(ids))})", tuple(ids)
+        )
+        ejecutar_consulta("DELETE FROM productos WHERE id IN (%s, %s)", (escaso, abundante))
+        # Los pagos de prueba también sumaron en los resúmenes del panel
+        reconstruir_resumenes()
+    sys.exit(1 if errores else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -43,6 +43,7 @@ CREATE TABLE IF NOT EXISTS productos (
     imagen VARCHAR(255) DEFAULT 'sin_imagen.png',
     categoria_id INT,
     activo TINYINT(1) DEFAULT 1,
+    version INT NOT NULL DEFAULT 1,
     fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (categoria_id) REFERENCES categorias(id) ON DELETE SET NULL
 ) ENGINE=InnoDB;
@@ -76,6 +77,58 @@ CREATE TABLE IF NOT EXISTS detalle_pedido (
     FOREIGN KEY (producto_id) REFERENCES productos(id) ON DELETE CASCADE
 ) ENGINE=InnoDB;
 
+-- --------------------------------------------
+-- Tabla: versiones_cache
+-- Contadores que se incrementan con cada cambio del catálogo; todos los
+-- workers los consultan para invalidar sus cachés en memoria
+-- --------------------------------------------
+CREATE TABLE IF NOT EXISTS versiones_cache (
+    nombre VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+) ENGINE=InnoDB;
+
+INSERT INTO versiones_cache (nombre, version) VALUES ('catalogo', 0);
+
+-- --------------------------------------------
+-- Tabla: carritos_items
+-- Carritos guardados en el servidor (la cookie solo lleva carrito_id)
+-- --------------------------------------------
+CREATE TABLE IF NOT EXISTS carritos_items (
+    carrito_id CHAR(32) NOT NULL,
+    producto_id INT NOT NULL,
+    cantidad INT NOT NULL,
+    actualizado DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (carrito_id, producto_id),
+    INDEX idx_carritos_actualizado (actualizado),
+    FOREIGN KEY (producto_id) REFERENCES productos(id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+-- --------------------------------------------
+-- Tablas de resumen de ventas (panel de administración)
+-- Se actualizan en la misma transacción que cambia el estado de un pedido
+-- --------------------------------------------
+CREATE TABLE IF NOT EXISTS resumen_ventas (
+    id TINYINT PRIMARY KEY,
+    total_ventas DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    total_pedidos INT NOT NULL DEFAULT 0
+) ENGINE=InnoDB;
+
+INSERT INTO resumen_ventas (id, total_ventas, total_pedidos) VALUES (1, 0, 0);
+
+CREATE TABLE IF NOT EXISTS resumen_ventas_mensuales (
+    mes CHAR(7) PRIMARY KEY,
+    total_ventas DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    total_pedidos INT NOT NULL DEFAULT 0
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS resumen_ventas_productos (
+    producto_id INT PRIMARY KEY,
+    total_vendido INT NOT NULL DEFAULT 0,
+    total_ingresos DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    INDEX idx_resumen_vendido (total_vendido),
+    FOREIGN KEY (producto_id) REFERENCES productos(id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
 -- --------------------------------------------
 -- Índices
 -- --------------------------------------------
@@ -84,6 +137,12 @@ CREATE INDEX idx_productos_precio ON productos(precio);
 CREATE INDEX idx_pedidos_usuario ON pedidos(usuario_id);
 CREATE INDEX idx_pedidos_fecha ON pedidos(fecha);
 CREATE INDEX idx_detalle_pedido ON detalle_pedido(pedido_id);
+-- Paginación por cursor del catálogo: ORDER BY fecha_creacion, id
+CREATE INDEX idx_productos_activo_fecha ON productos(activo, fecha_creacion, id);
+CREATE INDEX idx_productos_categoria_fecha ON productos(categoria_id, activo, fecha_creacion, id);
+-- Búsqueda de texto con relevancia (la colación pliega acentos y mayúsculas)
+CREATE FULLTEXT INDEX ft_productos_nombre ON productos(nombre);
+CREATE FULLTEXT INDEX ft_productos_busqueda ON productos(nombre, descripcion);
 
 -- El usuario administrador se crea automáticamente al iniciar la aplicación Flask
 -- con contraseña encriptada con bcrypt.